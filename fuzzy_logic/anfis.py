@@ -1,11 +1,11 @@
 import numpy as np
-from typing import Dict, List
+from typing import List, Tuple
 from .sugeno_fs import SugenoFuzzySystem
-from .rules import FuzzyRule
-from .variables import FuzzyVariable, SugenoVariable, LinearSugenoFunction
+from .variables import FuzzyVariable, SugenoVariable, LinearSugenoFunction, ConstantSugenoFunction
 from .terms import Term
-from .mf import NormalMF
+from .mf import NormalMF, NormalShape
 from .clustering import SubtractClustering
+from .types import ConsequentSolver
 
 
 class Anfis(SugenoFuzzySystem):
@@ -45,6 +45,9 @@ class Anfis(SugenoFuzzySystem):
         self.__nu: float = .1  # Коэффициент обучения
         self.__nu_step: float = .9  # Изменение nu на каждом шаге
         self.__rules_text: List[str] = []  # Текстовое представление правил
+        self.__solver: ConsequentSolver = ConsequentSolver.PINV  # Метод расчета коэффициентов заключений
+        self.__ridge: float = .0  # Коэффициент гребневой регуляризации нормальных уравнений
+        self.__chunk_size: int = 4096  # Размер порции образцов для ConsequentSolver.CHUNKED
 
     @property
     def rules_text(self) -> List[str]:
@@ -131,6 +134,45 @@ class Anfis(SugenoFuzzySystem):
             raise Exception(f'Значение не может быть меньше 0')
         self.__epochs = value
 
+    @property
+    def solver(self) -> ConsequentSolver:
+        """
+        :return: метод расчета коэффициентов заключений
+        """
+        return self.__solver
+
+    @solver.setter
+    def solver(self, value: ConsequentSolver):
+        if not isinstance(value, ConsequentSolver):
+            raise Exception(f'Неизвестный метод расчета коэффициентов: {value}')
+        self.__solver = value
+
+    @property
+    def ridge(self) -> float:
+        """
+        :return: коэффициент гребневой регуляризации для CHOLESKY и CHUNKED
+        """
+        return self.__ridge
+
+    @ridge.setter
+    def ridge(self, value: float):
+        if value < 0:
+            raise Exception(f'Значение ridge не может быть меньше 0')
+        self.__ridge = value
+
+    @property
+    def chunk_size(self) -> int:
+        """
+        :return: количество образцов в порции для CHUNKED
+        """
+        return self.__chunk_size
+
+    @chunk_size.setter
+    def chunk_size(self, value: int):
+        if value < 1:
+            raise Exception(f'Значение chunk_size не может быть меньше 1')
+        self.__chunk_size = value
+
     @property
     def errors_train(self) -> List[float]:
         """
@@ -178,59 +220,123 @@ class Anfis(SugenoFuzzySystem):
         c: np.ndarray = np.array((l, 1))
         y: np.ndarray = np.array(self.y)  # Вектор столбец выходных данных
         self.__errors_train = []  # Обнуляем ошибку обучения
+        samples: np.ndarray = self.validate_input_array(self.x.T)  # Образцы x входные переменные
+        x1: np.ndarray = np.column_stack([np.ones(k), samples])  # +1, тк x0 = 1
         for current_epoch in range(self.__epochs):
-            # Формируем матрицу коэффициентов
-            w: np.ndarray = np.zeros((k, l))
-            ew: np.ndarray = np.zeros((k, len(self.rules)))
-            for i in range(k):
-                # Агрегирование подусловий
-                rules_weight: Dict[FuzzyRule, float] = self.evaluate_conditions(
-                    self.fuzzify({variable: self.x[j][i] for j, variable in enumerate(self.inp)})
-                )
-                ew[i, :] = np.array([*rules_weight.values()], float)
-                beta: np.ndarray = ew[i, :] / sum(rules_weight.values())
-                # Формируем входные переменные
-                x: np.ndarray = np.ones(self.count_input + 1)  # +1, тк x0 = 1
-                x[1:] = self.x[:, i]
-                column_weight: int = 0
-                for g in beta:  # перебираем по заключениям
-                    for d in x:  # Перебираем по входным данным
-                        w[i, column_weight] = g * d  # Перемножаем коэффициенты на переменные
-                        column_weight += 1  # Увеличиваем строку на 1
-
-            c = np.dot(np.linalg.pinv(w), y)
-            y_hatch: np.ndarray = np.dot(w, c)  # Фактический выход сети
-            # Правим коэффициенты
+            # Пока что меняем только колоколообразные функции принадлежности: (переменная, термы, функции, b, sigma)
+            premises: List[Tuple[int, List[int], List[NormalShape], np.ndarray, np.ndarray]] = []
             for i, fv in enumerate(self.inp):
-                for j, term in enumerate(fv.terms):
-                    if not isinstance(term.mf, NormalMF):
-                        # Пока что меняем только в том случае, если функция принадлежности колоколообразная
-                        continue
-                    mf: NormalMF = term.mf
-                    # Перебираем все переменные, k - количество входных переменных
-                    for g in range(k):
-                        xa: float = self.x[i][g] - mf.b
-                        yy_hatch = y_hatch[g] - self.y[g]  # y' - y
-                        p: float = ew[g, j]
-                        sp: float = sum(ew[g, :])
-                        pb: float = p / (sp / mf.sigma ** 2)
-                        # Инициализирум матрицы для нахождения C
-                        x: np.ndarray = np.ones((self.count_input + 1))
-                        x[1:] = self.x[:, g]
-                        c_hatch: np.ndarray = np.ones((self.count_input + 1))
-                        # Заполняем коэффициенты
-                        start: int = j * (self.count_input + 1)
-                        c_hatch[:] = c[start:start + (self.count_input + 1)]
-                        cy: float = np.dot(x, c_hatch[:, np.newaxis])[0] - y_hatch[g]
-                        mf.b -= 2 * self.nu * xa * yy_hatch * cy * pb  # Корректируем b
-                        mf.sigma -= 2 * self.nu * (xa ** 2) * yy_hatch * cy * pb  # Корректируем sigma
+                terms: List[int] = [j for j, term in enumerate(fv.terms) if isinstance(term.mf, NormalShape)]
+                if len(terms) != 0:
+                    mfs: List[NormalShape] = [fv.terms[j].mf for j in terms]
+                    premises.append((i, terms, mfs, np.array([mf.b for mf in mfs]), np.array([mf.sigma for mf in mfs])))
+            if self.__solver == ConsequentSolver.CHUNKED:
+                # Матрица коэффициентов строится по порциям, накапливаются W^T W и W^T y
+                wtw: np.ndarray = np.zeros((l, l))
+                wty: np.ndarray = np.zeros(l)
+                for start in range(0, k, self.__chunk_size):
+                    part: slice = slice(start, start + self.__chunk_size)
+                    w: np.ndarray = self.__design_matrix(
+                        self.evaluate_conditions_batch(self.fuzzify_batch(samples[part])).T, x1[part]
+                    )
+                    wtw += w.T @ w
+                    wty += w.T @ y[part]
+                c = self.__solve_normal(wtw, wty)
+                # Второй проход: выход сети, ошибка и градиент накапливаются по порциям
+                gradient: List[np.ndarray] = [np.zeros((2, len(premise[1]))) for premise in premises]
+                error: float = .0
+                for start in range(0, k, self.__chunk_size):
+                    part: slice = slice(start, start + self.__chunk_size)
+                    ew: np.ndarray = self.evaluate_conditions_batch(self.fuzzify_batch(samples[part])).T
+                    y_hatch: np.ndarray = self.__design_matrix(ew, x1[part]) @ c
+                    for total, value in zip(gradient, self.__premise_gradient(
+                            premises, ew, x1[part], samples[part], y_hatch, y[part], c)):
+                        total += value
+                    error += np.sum(.5 * (y_hatch - y[part]) ** 2)
+            else:
+                # Агрегирование подусловий для всей выборки (образцы x правила)
+                ew: np.ndarray = self.evaluate_conditions_batch(self.fuzzify_batch(samples)).T
+                w: np.ndarray = self.__design_matrix(ew, x1)
+                if self.__solver == ConsequentSolver.LSTSQ:
+                    c = np.linalg.lstsq(w, y, rcond=None)[0]
+                elif self.__solver == ConsequentSolver.CHOLESKY:
+                    c = self.__solve_normal(w.T @ w, w.T @ y)
+                else:
+                    c = np.dot(np.linalg.pinv(w), y)
+                y_hatch: np.ndarray = np.dot(w, c)  # Фактический выход сети
+                gradient: List[np.ndarray] = self.__premise_gradient(premises, ew, x1, samples, y_hatch, y, c)
+                error: float = sum(.5 * (y_hatch - self.y) ** 2)
+            # Правим коэффициенты: градиент по всей выборке, один шаг за эпоху
+            for (i, terms, mfs, b, sigma), (grad_b, grad_sigma) in zip(premises, gradient):
+                b -= 2 * self.nu * grad_b  # Корректируем b
+                sigma -= 2 * self.nu * grad_sigma  # Корректируем sigma
+                for mf, mf_b, mf_sigma in zip(mfs, b.tolist(), sigma.tolist()):
+                    mf.b, mf.sigma = mf_b, mf_sigma
             # Находим ошибку обучения на этапе
-            self.__errors_train.append(sum(.5 * (y_hatch - self.y) ** 2))
+            self.__errors_train.append(error)
         # Применяем параметры коэффициентов y = c0 + c1 * x1 + c2 * x2 + ... + ci * xi
         self.__set_coefficient(c)
         # Перезаписываем правила в силу ссылочного типа архитектуры
         self.rules = [self.parse_rule(rule) for rule in self.__rules_text]
 
+    def __premise_gradient(self,
+                           premises: List[Tuple[int, List[int], List[NormalShape], np.ndarray, np.ndarray]],
+                           ew: np.ndarray,
+                           x1: np.ndarray,
+                           samples: np.ndarray,
+                           y_hatch: np.ndarray,
+                           y: np.ndarray,
+                           c: np.ndarray) -> List[np.ndarray]:
+        """
+        Суммы градиента ошибки по параметрам колоколообразных функций принадлежности для части выборки
+        :param premises: (переменная, термы, функции, b, sigma) по входным переменным
+        :param ew: степени срабатывания (образцы x правила)
+        :param x1: входные данные с единичным столбцом
+        :param samples: входные данные (образцы x входные переменные)
+        :param y_hatch: выход сети
+        :param y: выходные данные
+        :param c: коэффициенты заключений
+        :return: суммы для b и sigma (2 x термы) по входным переменным
+        """
+        sp: np.ndarray = ew.sum(axis=1)
+        # Отклонение выхода правила от выхода сети (образцы x правила)
+        cy: np.ndarray = np.dot(x1, c.reshape(len(self.rules), -1).T) - y_hatch[:, np.newaxis]
+        common: np.ndarray = (y_hatch - y)[:, np.newaxis] * cy * ew / sp[:, np.newaxis]
+        gradient: List[np.ndarray] = []
+        for i, terms, mfs, b, sigma in premises:
+            xa: np.ndarray = samples[:, i, np.newaxis] - b
+            pb: np.ndarray = common[:, terms] * sigma ** 2
+            gradient.append(np.array([np.sum(xa * pb, axis=0), np.sum(xa ** 2 * pb, axis=0)]))
+        return gradient
+
+    @staticmethod
+    def __design_matrix(ew: np.ndarray, x1: np.ndarray) -> np.ndarray:
+        """
+        Матрица коэффициентов: строка - внешнее произведение нормированных степеней срабатывания на входные данные
+        :param ew: степени срабатывания (образцы x правила)
+        :param x1: входные данные с единичным столбцом (образцы x (входные переменные + 1))
+        :return: матрица (образцы x правила * (входные переменные + 1))
+        """
+        # Сумма степеней по правилам в том же порядке, что и sum
+        total: np.ndarray = np.zeros(ew.shape[0])
+        for column in ew.T:
+            total = total + column
+        beta: np.ndarray = ew / total[:, np.newaxis]
+        return (beta[:, :, np.newaxis] * x1[:, np.newaxis, :]).reshape(ew.shape[0], -1)
+
+    def __solve_normal(self, wtw: np.ndarray, wty: np.ndarray) -> np.ndarray:
+        """
+        Решаем нормальные уравнения (W^T W + ridge * I) c = W^T y разложением Холецкого
+        :param wtw: матрица W^T W
+        :param wty: вектор W^T y
+        :return: коэффициенты заключений
+        """
+        try:
+            lower: np.ndarray = np.linalg.cholesky(wtw + self.__ridge * np.eye(len(wty)))
+        except np.linalg.LinAlgError:
+            raise Exception('Матрица нормальных уравнений не положительно определена, задайте ridge > 0')
+        return np.linalg.solve(lower.T, np.linalg.solve(lower, wty))
+
     def generate(self):
         """
         Генерируем anfis
@@ -262,14 +368,13 @@ class Anfis(SugenoFuzzySystem):
                 ]
             ) for i, center_in in enumerate(centers_in)
         ]
-        # Формируем выходные переменные нулевыми значениями
+        # Формируем выходные переменные постоянными функциями, до обучения коэффициенты при переменных нулевые
         self.out = [
             SugenoVariable(
                 f'{self.name_output}1',
                 *[
-                    LinearSugenoFunction(
+                    ConstantSugenoFunction(
                         f'{self.name_mf}{j + 1}',
-                        {variable: .0 for variable in self.inp},  # По умолчанию нулевые значения
                         center  # По умолчанию константа как центр
                     ) for j, center in enumerate(centers_out)
                 ]
@@ -292,7 +397,7 @@ class Anfis(SugenoFuzzySystem):
         :param c: Матрица коэффициентов
         """
         for i, function in enumerate(self.output_by_name(f'{self.name_output}1').functions):
-            if isinstance(function, LinearSugenoFunction):
+            if isinstance(function, (LinearSugenoFunction, ConstantSugenoFunction)):
                 # Настройка фукнции принадлежности y = c0 + c1 * x1 + c2 * x2 + ... + ci * xi
                 m: int = self.count_input + 1  # т.к. с0 <- +1
                 start_position: int = i * m  # Позиция функции принадлежности в матрицы
@@ -304,4 +409,5 @@ class Anfis(SugenoFuzzySystem):
                     coefficients[0]
                 )
             else:
-                raise Exception(f'Предусмотрено использование только LinearSugenoFunction в Anfis.')
+                raise Exception('Предусмотрено использование только LinearSugenoFunction и ConstantSugenoFunction '
+                                'в Anfis.')
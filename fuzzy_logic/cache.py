@@ -0,0 +1,102 @@
+"""
+Luferov Victor <lyferov@yandex.ru>
+
+Cache of results of fuzzy systems
+"""
+
+from collections import OrderedDict, namedtuple
+from typing import List, Dict, Tuple, Hashable
+from .variables import FuzzyVariable
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'evictions', 'size', 'max_size'])
+
+
+class ResultCache:
+    """
+    LRU cache of results keyed by input values quantized to the resolution of every variable.
+    All inputs of one cell of the grid share the result calculated at the grid point of the cell.
+    Cached results belong to the state of the system they were calculated with, see GenericFuzzySystem.state_key.
+    """
+
+    def __init__(self, resolution: [float, Dict[FuzzyVariable, float]] = .0, max_size: int = 1024):
+        """
+        :param resolution: quantization step for all variables or for every variable, zero keeps values exact
+        :param max_size: maximum number of cached results
+        """
+        if max_size < 1:
+            raise ValueError('max_size must be positive')
+        self.resolution: [float, Dict[FuzzyVariable, float]] = resolution
+        self.max_size: int = max_size
+        self.state: Hashable = None
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.__results: OrderedDict = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.__results)
+
+    def step(self, variable: FuzzyVariable) -> float:
+        """
+        :return: quantization step of variable
+        """
+        if isinstance(self.resolution, dict):
+            return self.resolution.get(variable, .0)
+        return self.resolution
+
+    def quantize(self,
+                 inp: List[FuzzyVariable],
+                 values: Dict[FuzzyVariable, float]) -> Tuple[tuple, Dict[FuzzyVariable, float]]:
+        """
+        Quantize input values
+        :param inp: input variables of the system
+        :param values: input values
+        :return: key of the grid cell and values at the grid point of the cell
+        """
+        key: list = []
+        point: Dict[FuzzyVariable, float] = {}
+        for variable in inp:
+            value: float = values[variable]
+            step: float = self.step(variable)
+            if step > 0:
+                cell: int = round(value / step)
+                key.append(cell)
+                point[variable] = min(max(cell * step, variable.min_value), variable.max_value)
+            else:
+                key.append(value)
+                point[variable] = value
+        return tuple(key), point
+
+    def get(self, key: tuple) -> [dict, None]:
+        """
+        Find result and mark it as recently used
+        :param key: key of the grid cell
+        :return: result or None
+        """
+        result: [dict, None] = self.__results.get(key)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.__results.move_to_end(key)
+        return result
+
+    def put(self, key: tuple, result: dict):
+        """
+        Store result, the least recently used one is evicted when cache is full
+        :param key: key of the grid cell
+        :param result: result of calculation
+        """
+        self.__results[key] = result
+        if len(self.__results) > self.max_size:
+            self.__results.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """
+        Drop all results, counters are kept
+        """
+        self.__results.clear()
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.evictions, len(self.__results), self.max_size)
@@ -0,0 +1,319 @@
+"""
+Luferov Victor <lyferov@yandex.ru>
+
+Compiled rule base
+"""
+
+from typing import List, Dict, Tuple, Callable, Hashable
+import numpy as np
+from .terms import Term
+from .variables import FuzzyVariable
+from .rules import FuzzyRule, Conditions, FuzzyCondition
+from .types import AndMethod, OrMethod, OperatorType, HedgeType
+
+Kernel = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+HEDGE_EXPONENTS: Dict[HedgeType, float] = {
+    HedgeType.NULL: 1.,
+    HedgeType.SLIGHTLY: 1. / 3.,
+    HedgeType.SOMEWHAT: .5,
+    HedgeType.VERY: 2.,
+    HedgeType.EXTREMELY: 3.,
+}
+
+
+def hamacher_and(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    s: np.ndarray = a + b - a * b
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(s == 0, 0., a * b / s)
+
+
+def einstein_and(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return a * b / (2 - (a + b - a * b))
+
+
+def drastic_and(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.where(a == 1, b, np.where(b == 1, a, 0.))
+
+
+def hamacher_or(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    p: np.ndarray = a * b
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(p == 1, 1., (a + b - 2 * p) / (1 - p))
+
+
+def drastic_or(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.where(a == 0, b, np.where(b == 0, a, 1.))
+
+
+# Registries of elementwise kernels: t-norms for AND and t-conorms for OR.
+# Keys are methods of fuzzy systems, any hashable key may be registered with a user kernel
+AND_KERNELS: Dict[Hashable, Kernel] = {
+    AndMethod.MIN: np.minimum,
+    AndMethod.PROD: np.multiply,
+    AndMethod.LUKASIEWICZ: lambda a, b: np.maximum(0., a + b - 1),
+    AndMethod.HAMACHER: hamacher_and,
+    AndMethod.EINSTEIN: einstein_and,
+    AndMethod.DRASTIC: drastic_and,
+}
+
+OR_KERNELS: Dict[Hashable, Kernel] = {
+    OrMethod.MAX: np.maximum,
+    OrMethod.PROB: lambda a, b: a + b - a * b,
+    OrMethod.BOUNDED_SUM: lambda a, b: np.minimum(1., a + b),
+    OrMethod.HAMACHER: hamacher_or,
+    OrMethod.EINSTEIN: lambda a, b: (a + b) / (1 + a * b),
+    OrMethod.DRASTIC: drastic_or,
+}
+
+
+def register_and_kernel(method: Hashable, kernel: Kernel):
+    """
+    Register t-norm for AND, kernel is applied elementwise to arrays and must give 0 when one operand is 0
+    :param method: key to be used as and_method of fuzzy systems
+    :param kernel: function of two arrays
+    """
+    AND_KERNELS[method] = kernel
+
+
+def register_or_kernel(method: Hashable, kernel: Kernel):
+    """
+    Register t-conorm for OR, kernel is applied elementwise to arrays
+    :param method: key to be used as or_method of fuzzy systems
+    :param kernel: function of two arrays
+    """
+    OR_KERNELS[method] = kernel
+
+
+def and_kernel(method: [Hashable, Kernel]) -> Kernel:
+    """
+    :param method: registered key or kernel itself
+    :return: kernel of AND
+    """
+    if callable(method):
+        return method
+    if method not in AND_KERNELS:
+        raise Exception('Оператор метода "И" не найден')
+    return AND_KERNELS[method]
+
+
+def or_kernel(method: [Hashable, Kernel]) -> Kernel:
+    """
+    :param method: registered key or kernel itself
+    :return: kernel of OR
+    """
+    if callable(method):
+        return method
+    if method not in OR_KERNELS:
+        raise Exception('Оператор метода "ИЛИ" не найден')
+    return OR_KERNELS[method]
+
+
+class CompiledRules:
+    """
+    Rule base lowered into index arrays.
+
+    Input of evaluation is the flat vector of term values: terms of every input variable one after another,
+    plus one trailing zero for terms which are not found in variables. Leaves of conditions are gathered from it
+    with hedge exponents and NOT masks applied at once. Nodes of conditions are grouped by height, operator
+    and number of children, every group is folded child by child in the same order as
+    GenericFuzzySystem.evaluate_condition does, so the results are identical.
+
+    Conjunctive rules (a flat AND of conditions without NOT) are zero unless all their terms are non-zero.
+    They are also stored as padded rows of leaves with an inverted index from term to rules, so evaluate_active
+    computes only the rules whose terms are all active. Other rules are compiled separately and always evaluated.
+    """
+
+    def __init__(self,
+                 rules: List[FuzzyRule],
+                 inp: List[FuzzyVariable],
+                 am: AndMethod = AndMethod.PROD,
+                 om: OrMethod = OrMethod.MAX,
+                 index: bool = True):
+        self.inp: List[FuzzyVariable] = list(inp)
+        self.offsets: Dict[FuzzyVariable, int] = {}
+        self.positions: Dict[FuzzyVariable, Dict[Term, int]] = {}
+        size: int = 0
+        for variable in self.inp:
+            self.offsets[variable] = size
+            self.positions[variable] = {term: i for i, term in reversed(list(enumerate(variable.terms)))}
+            size += len(variable.terms)
+        self.size: int = size + 1
+        self.and_kernel: Kernel = and_kernel(am)
+        self.or_kernel: Kernel = or_kernel(om)
+
+        leaves: List[Tuple[int, float, bool]] = []
+        nodes: List[Tuple[int, OperatorType, bool, List[int]]] = []  # height, op, not, children
+
+        def lower(condition: [Conditions, FuzzyCondition]) -> Tuple[int, int]:
+            """
+            :return: reference to the node (leaves are negative) and height of the node
+            """
+            if isinstance(condition, Conditions):
+                if len(condition.conditions) == 0:
+                    raise Exception('Сотояний нет')
+                children: List[Tuple[int, int]] = [lower(c) for c in condition.conditions]
+                height: int = 1 + max(h for _, h in children)
+                nodes.append((height, condition.op, condition.not_, [ref for ref, _ in children]))
+                return len(nodes) - 1, height
+            elif isinstance(condition, FuzzyCondition):
+                leaves.append((self.term_index(condition.variable, condition.term.term),
+                               HEDGE_EXPONENTS.get(condition.hedge, 1.),
+                               condition.not_))
+                return -len(leaves), 0
+            raise Exception('Не найдено условие в нечетком правиле')
+
+        roots: List[int] = [lower(rule.condition)[0] for rule in rules]
+        # Значения: сначала листья, затем узлы
+        n_leaves: int = len(leaves)
+
+        def slot(ref: int) -> int:
+            return -ref - 1 if ref < 0 else n_leaves + ref
+
+        self.leaf_terms: np.ndarray = np.array([leaf[0] for leaf in leaves], dtype=int)
+        self.leaf_exponents: np.ndarray = np.array([leaf[1] for leaf in leaves], dtype=float)
+        self.leaf_not: np.ndarray = np.array([leaf[2] for leaf in leaves], dtype=bool)
+        self.hedged: bool = bool(np.any(self.leaf_exponents != 1.))
+        self.n_values: int = n_leaves + len(nodes)
+        self.roots: np.ndarray = np.array([slot(ref) for ref in roots], dtype=int)
+        groups: Dict[Tuple[int, OperatorType, int], List[int]] = {}
+        for i, (height, op, _, children) in enumerate(nodes):
+            if op not in (OperatorType.AND, OperatorType.OR) and len(children) > 1:
+                raise Exception('Оператор композиции не найден')
+            groups.setdefault((height, op, len(children)), []).append(i)
+        # Группа: операция, индексы узлов, матрица индексов потомков (узлы x потомки), маска NOT
+        self.groups: List[Tuple[OperatorType, np.ndarray, np.ndarray, np.ndarray]] = [
+            (
+                op,
+                np.array([slot(i) for i in ids], dtype=int),
+                np.array([[slot(ref) for ref in nodes[i][3]] for i in ids], dtype=int).reshape(len(ids), arity),
+                np.array([nodes[i][2] for i in ids], dtype=bool)
+            ) for (height, op, arity), ids in sorted(groups.items(), key=lambda item: item[0][0])
+        ]
+        if index:
+            self.__build_index(rules, inp, am, om)
+
+    def __build_index(self, rules: List[FuzzyRule], inp: List[FuzzyVariable], am: AndMethod, om: OrMethod):
+        """
+        Split rules into conjunctive ones with inverted index and the rest
+        """
+        conjunctive: List[int] = []
+        rows: List[List[Tuple[int, float]]] = []
+        other: List[int] = []
+        for i, rule in enumerate(rules):
+            leaves: [List[FuzzyCondition], None] = self.__conjunction(rule.condition)
+            if leaves is None:
+                other.append(i)
+            else:
+                conjunctive.append(i)
+                rows.append([(self.term_index(leaf.variable, leaf.term.term), HEDGE_EXPONENTS.get(leaf.hedge, 1.))
+                             for leaf in leaves])
+        width: int = max([len(row) for row in rows], default=0)
+        self.conjunctive: np.ndarray = np.array(conjunctive, dtype=int)
+        # Строки короче width дополняются, дополнение маскируется при свертке
+        self.conjunctive_terms: np.ndarray = np.zeros((len(rows), width), dtype=int)
+        self.conjunctive_exponents: np.ndarray = np.ones((len(rows), width))
+        self.conjunctive_pad: np.ndarray = np.ones((len(rows), width), dtype=bool)
+        for j, row in enumerate(rows):
+            self.conjunctive_terms[j, :len(row)] = [term for term, _ in row]
+            self.conjunctive_exponents[j, :len(row)] = [exponent for _, exponent in row]
+            self.conjunctive_pad[j, :len(row)] = False
+        # Инвертированный индекс: терм -> строки конъюнктивных правил (формат CSR)
+        pairs: List[Tuple[int, int]] = sorted({(term, j) for j, row in enumerate(rows) for term, _ in row})
+        self.index_pointers: np.ndarray = np.searchsorted(
+            np.array([term for term, _ in pairs], dtype=int), np.arange(self.size + 1)
+        )
+        self.index_rows: np.ndarray = np.array([j for _, j in pairs], dtype=int)
+        self.index_needed: np.ndarray = np.array([len({term for term, _ in row}) for row in rows], dtype=int)
+        self.other: np.ndarray = np.array(other, dtype=int)
+        self.other_rules: CompiledRules = CompiledRules([rules[i] for i in other], inp, am, om, index=False)
+
+    @staticmethod
+    def __conjunction(condition: [Conditions, FuzzyCondition]) -> [List[FuzzyCondition], None]:
+        """
+        :return: leaves of flat AND condition without NOT or None
+        """
+        if isinstance(condition, FuzzyCondition):
+            return None if condition.not_ else [condition]
+        if not isinstance(condition, Conditions) or condition.not_ or len(condition.conditions) == 0:
+            return None
+        if len(condition.conditions) > 1 and condition.op != OperatorType.AND:
+            return None
+        if not all(isinstance(c, FuzzyCondition) and not c.not_ for c in condition.conditions):
+            return None
+        return list(condition.conditions)
+
+    def term_index(self, variable: FuzzyVariable, term: Term) -> int:
+        """
+        :return: index of term in the flat vector of term values
+        """
+        if variable not in self.offsets:
+            raise Exception(f'Переменная {variable.name} не является входной')
+        position: [int, None] = self.positions[variable].get(term)
+        return self.size - 1 if position is None else self.offsets[variable] + position
+
+    def membership_vector(self, fi: Dict[FuzzyVariable, Dict[Term, float]]) -> np.ndarray:
+        """
+        Flat vector of term values from fuzzified input
+        :param fi: fuzzified input variables
+        :return: vector of term values
+        """
+        mu: np.ndarray = np.zeros(self.size)
+        for variable in self.inp:
+            offset: int = self.offsets[variable]
+            positions: Dict[Term, int] = self.positions[variable]
+            for term, value in fi[variable].items():
+                position: [int, None] = positions.get(term)
+                if position is not None:
+                    mu[offset + position] = value
+        return mu
+
+    def evaluate(self, mu: np.ndarray) -> np.ndarray:
+        """
+        Firing strengths of all rules
+        :param mu: vector of term values (size) or matrix (size x samples)
+        :return: vector (rules) or matrix (rules x samples)
+        """
+        values: np.ndarray = np.empty((self.n_values,) + mu.shape[1:])
+        n_leaves: int = len(self.leaf_terms)
+        leaves: np.ndarray = mu[self.leaf_terms]
+        if self.hedged:
+            leaves = np.power(leaves, self.leaf_exponents.reshape((-1,) + (1,) * (mu.ndim - 1)))
+        values[:n_leaves] = leaves
+        values[:n_leaves][self.leaf_not] = 1.0 - leaves[self.leaf_not]
+        for op, ids, children, not_ in self.groups:
+            kernel: Kernel = self.and_kernel if op == OperatorType.AND else self.or_kernel
+            result: np.ndarray = values[children[:, 0]]
+            for j in range(1, children.shape[1]):
+                result = kernel(result, values[children[:, j]])
+            result[not_] = 1.0 - result[not_]
+            values[ids] = result
+        return values[self.roots]
+
+    def evaluate_active(self, mu: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Non-zero firing strengths: conjunctive rules are looked up by the non-zero terms, other rules are evaluated
+        :param mu: vector of term values
+        :return: indices of rules in ascending order and their strengths
+        """
+        active: np.ndarray = np.flatnonzero(mu)
+        pointers: np.ndarray = self.index_pointers
+        hits: List[np.ndarray] = [self.index_rows[pointers[t]:pointers[t + 1]] for t in active.tolist()]
+        rows: np.ndarray = np.zeros(0, dtype=int)
+        if len(hits) > 0:
+            # Строка подходит, если все ее различные термы активны
+            counts: np.ndarray = np.bincount(np.concatenate(hits), minlength=len(self.index_needed))
+            rows = np.flatnonzero(counts == self.index_needed)
+        values: np.ndarray = mu[self.conjunctive_terms[rows]]
+        if self.hedged:
+            values = np.power(values, self.conjunctive_exponents[rows])
+        pad: np.ndarray = self.conjunctive_pad[rows]
+        strengths: np.ndarray = values[:, 0] if values.shape[1] > 0 else np.zeros(0)
+        for j in range(1, values.shape[1]):
+            # Дополнение не участвует в свертке, поэтому результат совпадает с полным вычислением
+            strengths = np.where(pad[:, j], strengths, self.and_kernel(strengths, values[:, j]))
+        ids: np.ndarray = np.concatenate([self.conjunctive[rows], self.other])
+        strengths = np.concatenate([strengths, self.other_rules.evaluate(mu)])
+        fired: np.ndarray = np.flatnonzero(strengths)
+        order: np.ndarray = fired[np.argsort(ids[fired], kind='stable')]
+        return ids[order], strengths[order]
@@ -0,0 +1,315 @@
+"""
+Luferov Victor <lyferov@yandex.ru>
+
+Defuzzification routines
+"""
+
+from typing import List, Tuple, Optional
+import numpy as np
+from .mf import MembershipFunction, TriangularShape, TrapezoidShape, NormalShape, PointsMF, ConstantMF, CompositeMF, \
+    TabulatedMF
+from .types import MfCompositionType, IntegrationMethod, DefazzificationMethod
+
+Polygon = Tuple[np.ndarray, np.ndarray]
+# Offsets of breakpoints of normal mf from the center in sigmas
+NORMAL_BREAKPOINTS: np.ndarray = np.array([-6., -3., -2., -1., 0., 1., 2., 3., 6.])
+# Uniform nodes added to the breakpoints at the start of adaptive integration
+START_NODES: int = 5
+
+
+def linear_pieces(mf: MembershipFunction) -> Optional[List[Polygon]]:
+    """
+    Split mf into piecewise linear polygons whose maximum is mf.
+    Polygon keeps the value of the edge point outside of its x range.
+    :param mf: membership function
+    :return: list of polygons (xs, ys) or None if mf is not piecewise linear
+    """
+    if isinstance(mf, TriangularShape):
+        return [(np.array([mf.x1, mf.x2, mf.x3], dtype=float), np.array([0., 1., 0.]))]
+    elif isinstance(mf, TrapezoidShape):
+        return [(np.array([mf.x1, mf.x2, mf.x3, mf.x4], dtype=float), np.array([0., 1., 1., 0.]))]
+    elif isinstance(mf, PointsMF):
+        return [(mf.xs, mf.ys)]
+    elif isinstance(mf, ConstantMF):
+        return [(np.array([0.]), np.array([mf.value], dtype=float))]
+    elif isinstance(mf, CompositeMF):
+        if mf.composite_type == MfCompositionType.MAX:
+            pieces: List[Polygon] = []
+            for child in mf.mfs:
+                child_pieces: Optional[List[Polygon]] = linear_pieces(child)
+                if child_pieces is None:
+                    return None
+                pieces.extend(child_pieces)
+            return pieces
+        elif mf.composite_type in (MfCompositionType.MIN, MfCompositionType.PROD):
+            constants: List[float] = [child.value for child in mf.mfs if isinstance(child, ConstantMF)]
+            others: List[MembershipFunction] = [child for child in mf.mfs if not isinstance(child, ConstantMF)]
+            if len(others) == 0:
+                return linear_pieces(ConstantMF(min(constants) if mf.composite_type == MfCompositionType.MIN
+                                                else float(np.prod(constants))))
+            if len(others) != 1:
+                return None
+            pieces: Optional[List[Polygon]] = linear_pieces(others[0])
+            if pieces is None or len(constants) == 0:
+                return pieces
+            if mf.composite_type == MfCompositionType.MIN:
+                return [clip_polygon(xs, ys, min(constants)) for xs, ys in pieces]
+            return [(xs, ys * float(np.prod(constants))) for xs, ys in pieces]
+    return None
+
+
+def clip_polygon(xs: np.ndarray, ys: np.ndarray, level: float) -> Polygon:
+    """
+    Clip polygon at level: min(polygon, level)
+    :param xs: x of polygon points
+    :param ys: y of polygon points
+    :param level: clipping level
+    :return: clipped polygon with the crossing points inserted
+    """
+    cross: np.ndarray = np.nonzero((ys[:-1] - level) * (ys[1:] - level) < 0)[0]
+    if len(cross) > 0:
+        x_cross: np.ndarray = xs[cross] + \
+            (level - ys[cross]) * (xs[cross + 1] - xs[cross]) / (ys[cross + 1] - ys[cross])
+        xs = np.insert(xs, cross + 1, x_cross)
+        ys = np.insert(ys, cross + 1, level)
+    return xs, np.minimum(ys, level)
+
+
+def centroid_exact(mf: MembershipFunction, min_value: float, max_value: float) -> Optional[float]:
+    """
+    Centroid of piecewise linear mf on [min_value, max_value] in closed form
+    :param mf: membership function, usually the aggregated output set
+    :param min_value: minimum value
+    :param max_value: maximum value
+    :return: centroid or None if mf is not piecewise linear
+    """
+    pieces: Optional[List[Polygon]] = linear_pieces(mf)
+    if pieces is None:
+        return None
+    if len(pieces) == 0:
+        return 0.0
+    area, moment = integrate_envelope(pieces, min_value, max_value)
+    return moment / area if area > 0 else 0.0
+
+
+def integrate_envelope(pieces: List[Polygon], min_value: float, max_value: float) -> Tuple[float, float]:
+    """
+    Integrate the upper envelope of polygons
+    :param pieces: polygons (xs, ys)
+    :param min_value: minimum value
+    :param max_value: maximum value
+    :return: area and first moment of the envelope
+    """
+    breakpoints: np.ndarray = np.unique(np.concatenate([[min_value, max_value], *[xs for xs, _ in pieces]]))
+    breakpoints = breakpoints[(breakpoints >= min_value) & (breakpoints <= max_value)]
+    a: np.ndarray = breakpoints[:-1]
+    b: np.ndarray = breakpoints[1:]
+    middle: np.ndarray = (a + b) / 2
+    # Inside each elementary interval every polygon is linear: values at the ends of intervals
+    left: np.ndarray = np.empty((len(pieces), len(middle)))
+    right: np.ndarray = np.empty((len(pieces), len(middle)))
+    for i, (xs, ys) in enumerate(pieces):
+        j: np.ndarray = np.searchsorted(xs, middle, side='right') - 1
+        left[i] = right[i] = np.where(j < 0, ys[0], ys[-1])
+        inside: np.ndarray = (j >= 0) & (j < len(xs) - 1)
+        j = j[inside]
+        slope: np.ndarray = (ys[j + 1] - ys[j]) / (xs[j + 1] - xs[j])
+        left[i, inside] = ys[j] + slope * (a[inside] - xs[j])
+        right[i, inside] = ys[j] + slope * (b[inside] - xs[j])
+    top_left: np.ndarray = np.max(left, axis=0)
+    top_right: np.ndarray = np.max(right, axis=0)
+    # Envelope is linear where one polygon is on top at both ends of the interval
+    linear: np.ndarray = left[np.argmax(right, axis=0), np.arange(len(middle))] >= top_left
+    h: np.ndarray = (b - a)[linear]
+    area: float = float(np.sum(h * (top_left[linear] + top_right[linear]) / 2))
+    moment: float = float(np.sum(h / 6 * (a[linear] * (2 * top_left[linear] + top_right[linear]) +
+                                          b[linear] * (top_left[linear] + 2 * top_right[linear]))))
+    for k in np.nonzero(~linear)[0]:
+        t, y = envelope_vertices(left[:, k], right[:, k])
+        x: np.ndarray = a[k] + t * (b[k] - a[k])
+        h = np.diff(x)
+        area += float(np.sum(h * (y[:-1] + y[1:]) / 2))
+        moment += float(np.sum(h / 6 * (x[:-1] * (2 * y[:-1] + y[1:]) + x[1:] * (y[:-1] + 2 * y[1:]))))
+    return area, moment
+
+
+def envelope_vertices(left: np.ndarray, right: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vertices of the upper envelope of lines on [0, 1]
+    :param left: values of lines at 0
+    :param right: values of lines at 1
+    :return: t and values of the envelope vertices
+    """
+    slope: np.ndarray = right - left
+    top: np.ndarray = np.nonzero(left == np.max(left))[0]
+    current: int = int(top[np.argmax(slope[top])])
+    t: List[float] = [0.]
+    y: List[float] = [float(left[current])]
+    while True:
+        steeper: np.ndarray = slope > slope[current]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cross: np.ndarray = np.where(steeper, (left[current] - left) / (slope - slope[current]), np.inf)
+        cross[cross <= t[-1]] = np.inf
+        following: int = int(np.argmin(cross))
+        if cross[following] >= 1:
+            break
+        ties: np.ndarray = np.nonzero(cross == cross[following])[0]
+        current = int(ties[np.argmax(slope[ties])])
+        t.append(float(cross[following]))
+        y.append(float(left[current] + slope[current] * t[-1]))
+    t.append(1.)
+    y.append(float(right[current]))
+    return np.array(t), np.array(y)
+
+
+def integration_grid(method: IntegrationMethod,
+                     min_value: float,
+                     max_value: float,
+                     resolution: int = 101) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Points and weights of quadrature rule on uniform grid
+    :param method: RECTANGLE, TRAPEZOID or SIMPSON
+    :param min_value: minimum value
+    :param max_value: maximum value
+    :param resolution: number of points, SIMPSON uses the next odd number
+    :return: points and weights, weights are None for the rectangle sum where they are all equal
+    """
+    if method == IntegrationMethod.RECTANGLE:
+        if resolution < 1:
+            raise ValueError(f'Resolution {resolution} < 1')
+        step: float = (max_value - min_value) / resolution
+        return min_value + step * np.arange(resolution, dtype=float), None
+    if resolution < 2:
+        raise ValueError(f'Resolution {resolution} < 2')
+    if method == IntegrationMethod.TRAPEZOID:
+        points: np.ndarray = np.linspace(min_value, max_value, resolution)
+        weights: np.ndarray = np.full(resolution, points[1] - points[0])
+        weights[[0, -1]] /= 2
+        return points, weights
+    if method == IntegrationMethod.SIMPSON:
+        resolution += 1 - resolution % 2
+        points: np.ndarray = np.linspace(min_value, max_value, resolution)
+        weights: np.ndarray = np.full(resolution, 2.)
+        weights[1::2] = 4.
+        weights[[0, -1]] = 1.
+        return points, weights * (points[1] - points[0]) / 3
+    raise ValueError(f'{method} is not a quadrature on uniform grid')
+
+
+def support_breakpoints(mf: MembershipFunction) -> List[float]:
+    """
+    Finite bounds of supports of mf and of all operands of compositions,
+    for normal mf the points b + k * sigma where the curve changes are added
+    :param mf: membership function
+    :return: list of bounds
+    """
+    points: List[float] = [float(bound) for bound in mf.support if np.isfinite(bound)]
+    if isinstance(mf, NormalShape):
+        points.extend((mf.b + NORMAL_BREAKPOINTS * abs(mf.sigma)).tolist())
+    elif isinstance(mf, TabulatedMF):
+        points.extend(support_breakpoints(mf.mf))
+    elif isinstance(mf, CompositeMF):
+        for child in mf.mfs:
+            points.extend(support_breakpoints(child))
+    return points
+
+
+def centroid_adaptive(mf: MembershipFunction,
+                      min_value: float,
+                      max_value: float,
+                      tolerance: float = 1e-6,
+                      max_depth: int = 30,
+                      max_evaluations: int = 100000) -> Optional[float]:
+    """
+    Centroid by adaptive Simpson rule.
+    Integration starts from the intervals between the breakpoints of the operands and a few uniform nodes,
+    so narrow sets are not missed, and halves only intervals where the estimates of area or moment
+    on one and two panels differ. All intervals of one level are evaluated with one call of mf.get_values
+    :param mf: membership function, usually the aggregated output set
+    :param min_value: minimum value
+    :param max_value: maximum value
+    :param tolerance: tolerance of area relative to the largest value on the starting nodes times the width
+        of the support, but not less than tolerance times the width, moment tolerance is scaled by the magnitude of x
+    :param max_depth: maximum number of halvings
+    :param max_evaluations: maximum number of evaluated points
+    :return: centroid or None if the integration needs more than max_evaluations points
+    """
+    low, high = mf.support
+    low, high = max(low, min_value), min(high, max_value)
+    if not low < high:
+        return 0.0
+    edges: np.ndarray = np.unique(np.clip(np.concatenate([
+        support_breakpoints(mf), np.linspace(low, high, START_NODES)
+    ]), low, high))
+    a: np.ndarray = edges[:-1]
+    b: np.ndarray = edges[1:]
+    middle: np.ndarray = (a + b) / 2
+    # Общие концы соседних интервалов вычисляются один раз
+    f_edges, fm = np.split(mf.get_values(np.concatenate([edges, middle])), [len(edges)])
+    fa, fb = f_edges[:-1], f_edges[1:]
+    evaluations: int = len(edges) + len(middle)
+    scale: float = max(abs(low), abs(high), 1.)
+    reference: float = max(float(np.max(np.concatenate([f_edges, fm]))), tolerance) * (high - low)
+    area: float = 0.0
+    moment: float = 0.0
+    for depth in range(max_depth + 1):
+        evaluations += 2 * len(a)
+        if evaluations > max_evaluations:
+            return None
+        left: np.ndarray = (a + middle) / 2
+        right: np.ndarray = (middle + b) / 2
+        fl, fr = np.split(mf.get_values(np.concatenate([left, right])), 2)
+        h: np.ndarray = b - a
+        coarse_area: np.ndarray = h / 6 * (fa + 4 * fm + fb)
+        fine_area: np.ndarray = h / 12 * (fa + 4 * fl + 2 * fm + 4 * fr + fb)
+        coarse_moment: np.ndarray = h / 6 * (a * fa + 4 * middle * fm + b * fb)
+        fine_moment: np.ndarray = h / 12 * (a * fa + 4 * left * fl + 2 * middle * fm + 4 * right * fr + b * fb)
+        eps: np.ndarray = 15 * tolerance * reference * h / (high - low)
+        done: np.ndarray = (np.abs(fine_area - coarse_area) <= eps) & \
+            (np.abs(fine_moment - coarse_moment) <= eps * scale)
+        if depth == max_depth:
+            done[:] = True
+        # Экстраполяция Ричардсона
+        area += float(np.sum(fine_area[done] + (fine_area[done] - coarse_area[done]) / 15))
+        moment += float(np.sum(fine_moment[done] + (fine_moment[done] - coarse_moment[done]) / 15))
+        rest: np.ndarray = ~done
+        if not np.any(rest):
+            break
+        a, b = np.concatenate([a[rest], middle[rest]]), np.concatenate([middle[rest], b[rest]])
+        fa, fb = np.concatenate([fa[rest], fm[rest]]), np.concatenate([fm[rest], fb[rest]])
+        middle, fm = np.concatenate([left[rest], right[rest]]), np.concatenate([fl[rest], fr[rest]])
+    return moment / area if area != 0 else 0.0
+
+
+def defuzzify_sampled(method: DefazzificationMethod, points: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    Bisector and maximum methods for sets sampled on the same grid, along the last axis of values
+    :param method: BISECTOR, AVERAGE_MAXIMUM, SMALLEST_MAXIMUM or LARGEST_MAXIMUM
+    :param points: ascending grid
+    :param values: values of sets in points (... x points)
+    :return: results (...), zero for sets equal to zero everywhere
+    """
+    empty: np.ndarray = np.all(values == 0, axis=-1)
+    if method == DefazzificationMethod.BISECTOR:
+        # Площадь под множеством от начала сетки до каждой точки по формуле трапеций
+        areas: np.ndarray = np.zeros(values.shape)
+        np.cumsum(np.diff(points) * (values[..., :-1] + values[..., 1:]) / 2, axis=-1, out=areas[..., 1:])
+        half: np.ndarray = areas[..., -1:] / 2
+        right: np.ndarray = np.maximum(np.argmax(areas >= half, axis=-1), 1)[..., np.newaxis]
+        a0: np.ndarray = np.take_along_axis(areas, right - 1, axis=-1)
+        a1: np.ndarray = np.take_along_axis(areas, right, axis=-1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t: np.ndarray = np.where(a1 != a0, (half - a0) / (a1 - a0), 0.)
+        x0: np.ndarray = points[right - 1]
+        result: np.ndarray = (x0 + t * (points[right] - x0))[..., 0]
+    else:
+        top: np.ndarray = values == np.max(values, axis=-1, keepdims=True)
+        if method == DefazzificationMethod.AVERAGE_MAXIMUM:
+            result: np.ndarray = np.sum(points * top, axis=-1) / np.sum(top, axis=-1)
+        elif method == DefazzificationMethod.SMALLEST_MAXIMUM:
+            result: np.ndarray = points[np.argmax(top, axis=-1)]
+        elif method == DefazzificationMethod.LARGEST_MAXIMUM:
+            result: np.ndarray = points[len(points) - 1 - np.argmax(top[..., ::-1], axis=-1)]
+        else:
+            raise ValueError(f'{method} is not a sampled defuzzification method')
+    return np.where(empty, 0., result)
@@ -4,12 +4,17 @@ Luferov Victor <lyferov@yandex.ru>
 Generic fuzzy system
 """
 
-from typing import List, Dict
+from typing import List, Dict, Tuple, Callable, Sequence
 from collections import defaultdict
+import numpy as np
 from .variables import FuzzyVariable
 from .rules import FuzzyRule
 from .terms import Term
+from .mf import parameters_version
 from .rules import Conditions, FuzzyCondition
+from .compiled_rules import CompiledRules, and_kernel, or_kernel
+from .cache import ResultCache
+from .tracked_list import TrackedList, NameIndex
 from .types import AndMethod, OrMethod, OperatorType, HedgeType
 
 
@@ -26,6 +31,119 @@ class GenericFuzzySystem:
         self.rules: List[FuzzyRule] = []
         self.and_method: AndMethod = am
         self.or_method: OrMethod = om
+        self.__compiled: [CompiledRules, None] = None
+        self.__compiled_key: [tuple, None] = None
+        self.__cache: [ResultCache, None] = None
+        self.__input_names: NameIndex = NameIndex()
+        self.__output_names: NameIndex = NameIndex()
+
+    @property
+    def inp(self) -> List[FuzzyVariable]:
+        return self.__inp
+
+    @inp.setter
+    def inp(self, value: List[FuzzyVariable]):
+        self.__inp: TrackedList = TrackedList(value)
+
+    @property
+    def out(self) -> list:
+        return self.__out
+
+    @out.setter
+    def out(self, value: list):
+        self.__out: TrackedList = TrackedList(value)
+
+    @property
+    def rules(self) -> List[FuzzyRule]:
+        return self.__rules
+
+    @rules.setter
+    def rules(self, value: List[FuzzyRule]):
+        self.__rules: TrackedList = TrackedList(value)
+
+    def compile_rules(self) -> CompiledRules:
+        """
+        Компилируем базу правил в массивы индексов.
+        Скомпилированная база перестраивается при изменении списков rules, inp, термов входных переменных
+        или методов И/ИЛИ. После изменения самих правил на месте нужно вызвать self.rules.touch()
+        :return: скомпилированная база правил
+        """
+        key: tuple = (
+            self.__rules.version,
+            self.__inp.version,
+            tuple(variable.terms.version for variable in self.__inp),
+            self.and_method,
+            self.or_method
+        )
+        if self.__compiled is None or self.__compiled_key != key:
+            self.__compiled = CompiledRules(self.__rules, self.__inp, self.and_method, self.or_method)
+            self.__compiled_key = key
+        return self.__compiled
+
+    def state_key(self) -> tuple:
+        """
+        Состояние модели, от которого зависят результаты расчета: версии списков rules, inp, out,
+        термов входных переменных, параметров функций принадлежности и методы. Наследники дополняют его своими методами
+        :return: ключ состояния
+        """
+        return (
+            self.__rules.version,
+            self.__inp.version,
+            self.__out.version,
+            tuple(variable.terms.version for variable in self.__inp),
+            parameters_version(),
+            self.and_method,
+            self.or_method
+        )
+
+    @property
+    def cache(self) -> [ResultCache, None]:
+        return self.__cache
+
+    def enable_cache(self, resolution: [float, Dict[FuzzyVariable, float]] = .0, max_size: int = 1024) -> ResultCache:
+        """
+        Включаем кэширование результатов calculate.
+        Входные значения округляются до сетки с шагом resolution, расчет выполняется в узле сетки.
+        Кэш очищается при изменении state_key, после изменения самих правил на месте нужно вызвать self.rules.touch()
+        :param resolution: шаг квантования для всех переменных или для каждой переменной, 0 - без квантования
+        :param max_size: максимальное количество результатов, вытесняются давно не использованные
+        :return: кэш
+        """
+        self.__cache = ResultCache(resolution, max_size)
+        return self.__cache
+
+    def disable_cache(self):
+        """
+        Выключаем кэширование результатов calculate
+        """
+        self.__cache = None
+
+    def cached_calculate(self,
+                         input_values: Dict[FuzzyVariable, float],
+                         calculate: Callable[[dict], dict],
+                         validate: bool = True) -> dict:
+        """
+        Расчет с использованием кэша, если он включен
+        :param input_values: входные значения
+        :param calculate: функция расчета модели без проверки входных значений
+        :param validate: проверять входные значения, False - значения уже проверены
+        :return: результат расчета
+        """
+        if validate:
+            self.validate_input_values(input_values)
+        cache: [ResultCache, None] = self.__cache
+        if cache is None:
+            return calculate(input_values)
+        state: tuple = self.state_key()
+        if cache.state != state:
+            cache.clear()
+            cache.state = state
+        key, point = cache.quantize(self.__inp, input_values)
+        result: [dict, None] = cache.get(key)
+        if result is None:
+            result = calculate(point)
+            cache.put(key, result)
+        return dict(result)
 
     def input_by_name(self, name: str) -> FuzzyVariable:
         """
@@ -33,10 +151,21 @@ class GenericFuzzySystem:
         :param name: имя переменной
         :return: возвращаемая переменная
         """
-        for inp in self.inp:
-            if inp.name == name:
-                return inp
-        raise Exception(f'Выходной переменной с именем "{name}" не найдено')
+        variable: [FuzzyVariable, None] = self.__input_names.find(self.__inp, name)
+        if variable is None:
+            raise Exception(f'Выходной переменной с именем "{name}" не найдено')
+        return variable
+
+    def output_by_name(self, name: str):
+        """
+        Ищем выходную переменную по имени
+        :param name: имя переменной
+        :return: переменная
+        """
+        variable = self.__output_names.find(self.__out, name)
+        if variable is None:
+            raise Exception(f'Выходной переменной с именем "{name}" не найдено')
+        return variable
 
     def evaluate_conditions(self, fi: Dict[FuzzyVariable, Dict[Term, float]]) -> Dict[FuzzyRule, float]:
         """
@@ -44,20 +173,55 @@ class GenericFuzzySystem:
         :param fi: фаззицицированные входные переменные
         :return:
         """
-        return {rule: self.evaluate_condition(rule.condition, fi) for rule in self.rules}
+        compiled: CompiledRules = self.compile_rules()
+        return dict(zip(self.rules, compiled.evaluate(compiled.membership_vector(fi)).tolist()))
 
-    def fuzzify(self, inp: Dict[FuzzyVariable, float]) -> Dict[FuzzyVariable, Dict[Term, float]]:
+    def evaluate_active_conditions(self, fi: Dict[FuzzyVariable, Dict[Term, float]]) -> Dict[FuzzyRule, float]:
+        """
+        Расчитываем заключения только по сработавшим правилам.
+        Правила из И без НЕ ищутся по ненулевым термам, остальные правила вычисляются полностью
+        :param fi: фаззицицированные входные переменные
+        :return: правила с ненулевой степенью срабатывания в порядке self.rules
+        """
+        compiled: CompiledRules = self.compile_rules()
+        ids, strengths = compiled.evaluate_active(compiled.membership_vector(fi))
+        rules: List[FuzzyRule] = self.rules
+        return {rules[i]: strength for i, strength in zip(ids.tolist(), strengths.tolist())}
+
+    def fuzzify_batch(self, x: np.ndarray) -> np.ndarray:
+        """
+        Фаззификация матрицы значений
+        :param x: матрица входных значений (образцы x входные переменные) в порядке self.inp
+        :return: матрица значений термов (термы x образцы) в порядке скомпилированной базы правил
+        """
+        compiled: CompiledRules = self.compile_rules()
+        mu: np.ndarray = np.zeros((compiled.size, x.shape[0]))
+        for i, variable in enumerate(self.inp):
+            offset: int = compiled.offsets[variable]
+            mu[offset:offset + len(variable.terms)] = variable.fuzzify_values(x[:, i])
+        return mu
+
+    def evaluate_conditions_batch(self, mu: np.ndarray) -> np.ndarray:
+        """
+        Расчитываем заключения по нечетким правилам для матрицы значений термов
+        :param mu: матрица значений термов (термы x образцы), результат fuzzify_batch
+        :return: матрица степеней срабатывания (правила x образцы)
+        """
+        return self.compile_rules().evaluate(mu)
+
+    def fuzzify(self, inp: Dict[FuzzyVariable, float], validate: bool = True) -> Dict[FuzzyVariable, Dict[Term, float]]:
         """
         Фаззификация значений
         :param inp:
+        :param validate: проверять входные значения
         :return:
         """
-        self.validate_input_values(inp)
+        if validate:
+            self.validate_input_values(inp)
         result: Dict[FuzzyVariable, Dict[Term, float]] = defaultdict(Dict[Term, float])
         for variable in self.inp:
-            result[variable] = defaultdict(float)
-            for term in variable.terms:
-                result[variable][term] = term.mf.get_value(inp[variable])
+            # Вычисляются только термы, носитель которых содержит значение, остальные равны нулю
+            result[variable] = variable.fuzzify(inp[variable])
         return result
 
     def evaluate_condition(self,
@@ -98,23 +262,58 @@ class GenericFuzzySystem:
             raise Exception('Не найдено условие в нечетком правиле')
 
     def evaluate_condition_pair(self, condition1: float, condition2: float, op: OperatorType) -> float:
+        """
+        Вычисляем пару условий ядрами операторов, теми же, что и в скомпилированной базе правил
+        :param condition1: значение первого условия
+        :param condition2: значение второго условия
+        :param op: оператор
+        :return: значение
+        """
         if op == OperatorType.AND:
-            if self.and_method == AndMethod.MIN:
-                return min(condition1, condition2)
-            elif self.and_method == AndMethod.PROD:
-                return condition1 * condition2
-            else:
-                raise Exception('Оператор метода "И" не найден')
+            return float(and_kernel(self.and_method)(np.float64(condition1), np.float64(condition2)))
         elif op == OperatorType.OR:
-            if self.or_method == OrMethod.MAX:
-                return max(condition1, condition2)
-            elif self.or_method == OrMethod.PROB:
-                return condition1 + condition2 - condition1 * condition2
-            else:
-                raise Exception('Оператор метода "ИЛИ" не найден')
+            return float(or_kernel(self.or_method)(np.float64(condition1), np.float64(condition2)))
         else:
             raise Exception('Оператор композиции не найден')
 
+    def validate_input_array(self, x: np.ndarray) -> np.ndarray:
+        """
+        Проверка матрицы входных значений
+        :param x: матрица входных значений (образцы x входные переменные) в порядке self.inp
+        :return: матрица входных значений типа float
+        """
+        x = np.asarray(x, dtype=float)
+        if x.ndim != 2 or x.shape[1] != len(self.inp):
+            raise Exception('Количество входных значений не верно')
+        lower, upper = self.input_bounds()
+        if not np.all((lower <= x) & (x <= upper)):
+            raise Exception('Значние переменной выходит за диапазон')
+        return x
+
+    def validate_input_vector(self, x: Sequence[float]) -> List[float]:
+        """
+        Проверка вектора входных значений одним сравнением с границами
+        :param x: вектор входных значений в порядке self.inp
+        :return: входные значения
+        """
+        values: np.ndarray = np.asarray(x, dtype=float)
+        if values.shape != (len(self.inp),):
+            raise Exception('Количество входных значений не верно')
+        lower, upper = self.input_bounds()
+        if not ((lower <= values) & (values <= upper)).all():
+            raise Exception('Значние переменной выходит за диапазон')
+        return values.tolist()
+
+    def input_bounds(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Текущие границы входных переменных
+        :return: векторы минимальных и максимальных значений
+        """
+        return (
+            np.array([variable.min_value for variable in self.__inp], dtype=float),
+            np.array([variable.max_value for variable in self.__inp], dtype=float)
+        )
+
     def validate_input_values(self, inp: Dict[FuzzyVariable, float]):
         """
         Проверка валидности входных переменных
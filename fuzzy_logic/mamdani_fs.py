@@ -4,18 +4,23 @@ Luferov Victor <lyferov@yandex.ru>
 Mamdani Fuzzy System
 """
 
-from typing import List, Dict
+from typing import List, Dict, Tuple, Sequence
+import numpy as np
 from .generic_fs import GenericFuzzySystem
+from .compiled_rules import CompiledRules
+from .session import EvaluationSession
 from .rules import FuzzyRule
 from .variables import FuzzyVariable
 from .rule_parser import RuleParser
-from .mf import MembershipFunction, CompositeMF, ConstantMF
+from .mf import MembershipFunction, CompositeMF, ConstantMF, parameters_version
 from .terms import Term
+from .defuzzification import centroid_exact, centroid_adaptive, integration_grid, defuzzify_sampled
 from .types import AndMethod, \
     OrMethod, \
     ImplicationMethod, \
     AggregationMethod, \
     DefazzificationMethod, \
+    IntegrationMethod, \
     MfCompositionType
 
 
@@ -31,7 +36,10 @@ class MamdaniFuzzySystem(GenericFuzzySystem):
                  om: OrMethod = OrMethod.MAX,
                  im: ImplicationMethod = ImplicationMethod.MIN,
                  ag: AggregationMethod = AggregationMethod.MAX,
-                 dm: DefazzificationMethod = DefazzificationMethod.CENTROID):
+                 dm: DefazzificationMethod = DefazzificationMethod.CENTROID,
+                 it: IntegrationMethod = IntegrationMethod.RECTANGLE,
+                 resolution: int = 101,
+                 tolerance: float = 1e-6):
         """
         Конструктор создания нечеткой модели мамдани
         :param inp: входящие переменные
@@ -41,24 +49,20 @@ class MamdaniFuzzySystem(GenericFuzzySystem):
         :param im: метод нечеткой импликации
         :param ag: метод неечткого агрегирования
         :param dm: метод дефаззификации
+        :param it: метод интегрирования при дефаззификации центроидом
+        :param resolution: количество точек сетки интегрирования
+        :param tolerance: точность адаптивного интегрирования
         """
         self.out: List[FuzzyVariable] = out if out is not None else []
         self.implication_method: ImplicationMethod = im
         self.aggregation_method: AggregationMethod = ag
         self.def_method: DefazzificationMethod = dm
+        self.integration_method: IntegrationMethod = it
+        self.resolution: int = resolution
+        self.tolerance: float = tolerance
+        self.__grids: [tuple, None] = None
         super().__init__(inp if inp is not None else [], am, om)
 
-    def output_by_name(self, name: str) -> FuzzyVariable:
-        """
-        Ищем выходную переменную по имени
-        :param name: имя переменной
-        :return: переменная
-        """
-        for out in self.out:
-            if out.name == name:
-                return out
-        raise Exception(f'Выходной переменной с именем "{name}" не найдено')
-
     def parse_rule(self, rule: str) -> FuzzyRule:
         """
         Парсим правило из текста
@@ -67,16 +71,260 @@ class MamdaniFuzzySystem(GenericFuzzySystem):
         """
         return RuleParser.parse(rule, self.inp, self.out)
 
+    def state_key(self) -> tuple:
+        """
+        Состояние модели: дополнительно термы выходных переменных и методы импликации, агрегации и дефаззификации
+        :return: ключ состояния
+        """
+        return super().state_key() + (
+            tuple(variable.terms.version for variable in self.out),
+            self.implication_method,
+            self.aggregation_method,
+            self.def_method,
+            self.integration_method,
+            self.resolution,
+            self.tolerance
+        )
+
     def calculate(self, input_values: Dict[FuzzyVariable, float]) -> Dict[FuzzyVariable, float]:
+        """
+        Расчет нечеткой модели, результат берется из кэша, если он включен
+        :param input_values: входные значения
+        :return: значения выходных переменных
+        """
+        return self.cached_calculate(input_values, self.__calculate)
+
+    def calculate_vector(self, x: Sequence[float]) -> np.ndarray:
+        """
+        Расчет нечеткой модели для вектора входных значений
+        :param x: вектор входных значений в порядке self.inp
+        :return: вектор выходных значений в порядке self.out
+        """
+        result: Dict[FuzzyVariable, float] = self.cached_calculate(
+            dict(zip(self.inp, self.validate_input_vector(x))), self.__calculate, False
+        )
+        return np.array([result[variable] for variable in self.out])
+
+    def session(self, input_values: Dict[FuzzyVariable, float]) -> EvaluationSession:
+        """
+        Сессия расчета, при обновлении пересчитываются только измененные переменные и зависящие от них правила
+        :param input_values: начальные значения всех входных переменных
+        :return: сессия, результат update совпадает с calculate без кэша
+        """
+        return EvaluationSession(self, input_values)
+
+    def calculate_strengths(self, strengths: np.ndarray) -> Dict[FuzzyVariable, float]:
+        """
+        Импликация, агрегация и дефаззификация по степеням срабатывания правил, как в calculate
+        :param strengths: вектор степеней срабатывания в порядке self.rules
+        :return: значения выходных переменных
+        """
+        if self.aggregation_method == AggregationMethod.MAX:
+            ids: np.ndarray = np.flatnonzero(strengths)
+        else:
+            ids: np.ndarray = np.arange(len(strengths))
+        if self.__sampled():
+            return self.__conclude_sampled(ids, strengths[ids])
+        rules: List[FuzzyRule] = self.rules
+        conditions: Dict[FuzzyRule, float] = {
+            rules[i]: value for i, value in zip(ids.tolist(), strengths[ids].tolist())
+        }
+        return self.defuzzify(self.aggregate(self.implicate(conditions)))
+
+    def __calculate(self, input_values: Dict[FuzzyVariable, float]) -> Dict[FuzzyVariable, float]:
         if len(self.rules) == 0:
             raise Exception('Должно быть как минимум одно правило')
-        fi: Dict[FuzzyVariable, Dict[Term, float]] = self.fuzzify(input_values)                 # Шаг фаззификации
-        conditions: Dict[FuzzyRule, float] = self.evaluate_conditions(fi)                       # Вычисляем состояния
+        fi: Dict[FuzzyVariable, Dict[Term, float]] = self.fuzzify(input_values, False)          # Шаг фаззификации
+        if self.__sampled():
+            return self.__calculate_sampled(fi)
+        if self.aggregation_method == AggregationMethod.MAX:
+            # Правила с нулевой степенью срабатывания не меняют максимум, их можно не вычислять
+            conditions: Dict[FuzzyRule, float] = self.evaluate_active_conditions(fi)            # Вычисляем состояния
+        else:
+            conditions: Dict[FuzzyRule, float] = self.evaluate_conditions(fi)
         conclusions: Dict[FuzzyRule, MembershipFunction] = self.implicate(conditions)           # Вычисляем последствия
         fuzzy_result: Dict[FuzzyVariable, MembershipFunction] = self.aggregate(conclusions)     # Агрегация результатов
         result: Dict[FuzzyVariable, float] = self.defuzzify(fuzzy_result)                       # Дефаззафикация
         return result
 
+    def __calculate_sampled(self, fi: Dict[FuzzyVariable, Dict[Term, float]]) -> Dict[FuzzyVariable, float]:
+        """
+        Импликация, агрегация и дефаззификация на заранее вычисленных значениях термов в точках сетки,
+        обрабатываются только строки сработавших правил
+        :param fi: фаззифицированные входные переменные
+        :return: значения выходных переменных
+        """
+        compiled: CompiledRules = self.compile_rules()
+        mu: np.ndarray = compiled.membership_vector(fi)
+        if self.aggregation_method == AggregationMethod.MAX:
+            # Правила с нулевой степенью срабатывания не меняют максимум, их можно не вычислять
+            ids, strengths = compiled.evaluate_active(mu)
+        else:
+            strengths: np.ndarray = compiled.evaluate(mu)
+            ids: np.ndarray = np.arange(len(strengths))
+        return self.__conclude_sampled(ids, strengths)
+
+    def __conclude_sampled(self, ids: np.ndarray, strengths: np.ndarray) -> Dict[FuzzyVariable, float]:
+        """
+        Импликация, агрегация и дефаззификация на сетках выходных переменных
+        :param ids: индексы правил в порядке возрастания
+        :param strengths: степени срабатывания этих правил
+        :return: значения выходных переменных
+        """
+        grids, rule_variables, rule_rows = self.output_grids()
+        fired_variables: np.ndarray = rule_variables[ids]
+        result: Dict[FuzzyVariable, float] = {}
+        for j, (variable, (points, weights, _, rows)) in enumerate(zip(self.out, grids)):
+            fired: np.ndarray = fired_variables == j
+            result[variable] = float(self.__defuzzify_batch(
+                strengths[fired][np.newaxis, :], points, weights, rows[rule_rows[ids[fired]]]
+            )[0])
+        return result
+
+    def output_grids(self) -> Tuple[List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]],
+                                    np.ndarray,
+                                    np.ndarray]:
+        """
+        Значения термов заключений правил в точках сетки дефаззификации для каждой выходной переменной.
+        Пересчитываются при изменении списков rules, out, термов выходных переменных, параметров функций
+        принадлежности (parameters_version), метода дефаззификации или сетки
+        :return: сетки выходных переменных (точки, веса, индексы правил, значения термов правил),
+            индекс выходной переменной каждого правила (-1 для чужих) и строка правила в сетке переменной
+        """
+        key: tuple = (
+            self.rules.version,
+            self.out.version,
+            tuple(variable.terms.version for variable in self.out),
+            parameters_version(),
+            self.def_method,
+            self.integration_method,
+            self.resolution
+        )
+        if self.__grids is None or self.__grids[0] != key:
+            grids: List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = [
+                self.__output_grid(variable) for variable in self.out
+            ]
+            rule_variables: np.ndarray = np.full(len(self.rules), -1, dtype=int)
+            rule_rows: np.ndarray = np.zeros(len(self.rules), dtype=int)
+            for j, (_, _, rule_ids, _) in enumerate(grids):
+                rule_variables[rule_ids] = j
+                rule_rows[rule_ids] = np.arange(len(rule_ids))
+            self.__grids = (key, grids, rule_variables, rule_rows)
+        return self.__grids[1:]
+
+    def __sampled(self) -> bool:
+        """
+        :return: дефаззификация выполняется по значениям в точках равномерной сетки
+        """
+        return self.def_method != DefazzificationMethod.CENTROID or self.integration_method in (
+            IntegrationMethod.RECTANGLE, IntegrationMethod.TRAPEZOID, IntegrationMethod.SIMPSON
+        )
+
+    def calculate_batch(self, x: np.ndarray, memory: int = 2 ** 26) -> np.ndarray:
+        """
+        Расчет нечеткой модели для матрицы входных значений.
+        Образцы обрабатываются порциями, чтобы промежуточный массив (образцы x правила x точки) не превышал memory
+        :param x: матрица входных значений (образцы x входные переменные) в порядке self.inp
+        :param memory: ограничение памяти на промежуточные массивы одной порции, байт
+        :return: матрица выходных значений (образцы x выходные переменные) в порядке self.out
+        """
+        if len(self.rules) == 0:
+            raise Exception('Должно быть как минимум одно правило')
+        x = self.validate_input_array(x)
+        result: np.ndarray = np.empty((x.shape[0], len(self.out)))
+        sampled: bool = self.__sampled()
+        grids: List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = self.output_grids()[0] if sampled else []
+        width: int = max([self.compile_rules().size, len(self.rules)] + [rows.size for _, _, _, rows in grids])
+        chunk: int = max(1, memory // (8 * width))
+        for start in range(0, x.shape[0], chunk):
+            strengths: np.ndarray = self.evaluate_conditions_batch(self.fuzzify_batch(x[start:start + chunk]))
+            if sampled:
+                for j, (points, weights, rule_ids, rows) in enumerate(grids):
+                    result[start:start + chunk, j] = self.__defuzzify_batch(
+                        strengths[rule_ids].T, points, weights, rows
+                    )
+            else:
+                # Дефаззификация без дискретизации выполняется для каждого образца
+                skip_zeros: bool = self.aggregation_method == AggregationMethod.MAX
+                for i, weights in enumerate(strengths.T.tolist()):
+                    conditions: Dict[FuzzyRule, float] = {
+                        rule: weight for rule, weight in zip(self.rules, weights) if weight != 0 or not skip_zeros
+                    }
+                    fuzzy_result: Dict[FuzzyVariable, MembershipFunction] = self.aggregate(self.implicate(conditions))
+                    values: Dict[FuzzyVariable, float] = self.defuzzify(fuzzy_result)
+                    result[start + i] = [values[variable] for variable in self.out]
+        return result
+
+    def __output_grid(self, variable: FuzzyVariable) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Значения термов правил выходной переменной в точках дефаззификации
+        :param variable: выходная переменная
+        :return: точки, веса, индексы правил переменной, значения термов правил (правила x точки)
+        """
+        points, weights = self.__grid(variable.min_value, variable.max_value)
+        k: int = len(points)
+        rule_ids: List[int] = [i for i, rule in enumerate(self.rules) if rule.conclusion.variable == variable]
+        terms: Dict[Term, np.ndarray] = {}
+        for i in rule_ids:
+            term: Term = self.rules[i].conclusion.term
+            if term not in terms:
+                terms[term] = term.mf.get_values(points)
+        rows: np.ndarray = np.array([terms[self.rules[i].conclusion.term] for i in rule_ids]).reshape(-1, k)
+        return points, weights, np.array(rule_ids, dtype=int), rows
+
+    def __grid(self, min_value: float, max_value: float) -> Tuple[np.ndarray, [np.ndarray, None]]:
+        """
+        Сетка дефаззификации: для центроида по методу интегрирования, для остальных методов равномерная с границами
+        :param min_value: минимальное значение
+        :param max_value: максимальное значение
+        :return: точки и веса квадратурной формулы
+        """
+        method: IntegrationMethod = IntegrationMethod.TRAPEZOID
+        if self.def_method == DefazzificationMethod.CENTROID:
+            method = self.integration_method if self.integration_method in (
+                IntegrationMethod.TRAPEZOID, IntegrationMethod.SIMPSON
+            ) else IntegrationMethod.RECTANGLE
+        return integration_grid(method, min_value, max_value, self.resolution)
+
+    def __defuzzify_batch(self,
+                          strengths: np.ndarray,
+                          points: np.ndarray,
+                          weights: [np.ndarray, None],
+                          rows: np.ndarray) -> np.ndarray:
+        """
+        Импликация, агрегация и дефаззификация для порции образцов
+        :param strengths: степени срабатывания правил переменной (образцы x правила)
+        :param points: точки дефаззификации
+        :param weights: веса квадратурной формулы, None для суммы прямоугольников
+        :param rows: значения термов правил в точках (правила x точки)
+        :return: значения выходной переменной для образцов
+        """
+        if rows.shape[0] == 0:
+            return np.zeros(strengths.shape[0])
+        if self.implication_method == ImplicationMethod.MIN:
+            implicated: np.ndarray = np.minimum(strengths[:, :, np.newaxis], rows)
+        elif self.implication_method == ImplicationMethod.PROD:
+            implicated: np.ndarray = rows * strengths[:, :, np.newaxis]
+        else:
+            raise Exception(f'Тип композиции {self.implication_method} не найден')
+        if self.aggregation_method == AggregationMethod.MAX:
+            aggregated: np.ndarray = np.max(implicated, axis=1)
+        elif self.aggregation_method == AggregationMethod.SUM:
+            aggregated: np.ndarray = np.prod(implicated, axis=1) - np.sum(implicated, axis=1)
+        else:
+            raise Exception(f'Тип композиции {self.aggregation_method} не найден')
+        if self.def_method != DefazzificationMethod.CENTROID:
+            return defuzzify_sampled(self.def_method, points, aggregated)
+        if weights is None:
+            numerator: np.ndarray = np.sum(points * aggregated, axis=1)
+            denominator: np.ndarray = np.sum(aggregated, axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return np.where(denominator != 0, np.round(numerator / denominator, 8), 0.0)
+        numerator: np.ndarray = np.sum(points * weights * aggregated, axis=1)
+        denominator: np.ndarray = np.sum(weights * aggregated, axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(denominator != 0, numerator / denominator, 0.0)
+
     def implicate(self, conditions: Dict[FuzzyRule, float]) -> Dict[FuzzyRule, MembershipFunction]:
         """
         Функция импликации
@@ -108,12 +356,15 @@ class MamdaniFuzzySystem(GenericFuzzySystem):
             elif am == AggregationMethod.SUM:
                 return MfCompositionType.SUM
             raise Exception(f'Тип композиции {am} не найден')
-        return {
-            variable: CompositeMF(
-                composite_type(self.aggregation_method),
-                *[mf for rule, mf in conclusions.items() if rule.conclusion.variable == variable]
-            ) for variable in self.out
-        }
+        result: Dict[FuzzyVariable, MembershipFunction] = {}
+        for variable in self.out:
+            mfs: List[MembershipFunction] = [
+                mf for rule, mf in conclusions.items() if rule.conclusion.variable == variable
+            ]
+            # Ни одно правило переменной не сработало
+            result[variable] = CompositeMF(composite_type(self.aggregation_method), *mfs) if len(mfs) > 0 \
+                else ConstantMF(.0)
+        return result
 
     def defuzzify(self, fr: Dict[FuzzyVariable, MembershipFunction]) -> Dict[FuzzyVariable, float]:
         """
@@ -132,16 +383,30 @@ class MamdaniFuzzySystem(GenericFuzzySystem):
         :return:
         """
         if self.def_method == DefazzificationMethod.CENTROID:
-            k: int = 101   # Шаг дефаззицикации
-            step = (max_value - min_value) / k
-            numerator: float = 0
-            denominator: float = 0
-            for i in range(k):
-                pt_center = min_value + step * float(i)
-                val_center = mf.get_value(pt_center)
-                val2_center = pt_center * val_center
-                numerator += val2_center
-                denominator += val_center
-            return round(numerator / denominator, 8) if denominator != 0 else 0.0
+            if self.integration_method == IntegrationMethod.EXACT:
+                # Для кусочно-линейных термов центроид вычисляется точно, иначе переходим к дискретизации
+                exact: [float, None] = centroid_exact(mf, min_value, max_value)
+                if exact is not None:
+                    return exact
+            elif self.integration_method == IntegrationMethod.ADAPTIVE:
+                # Если адаптивное интегрирование требует слишком много точек, переходим к дискретизации
+                adaptive: [float, None] = centroid_adaptive(mf, min_value, max_value, self.tolerance)
+                if adaptive is not None:
+                    return adaptive
+            pt_center, weights = self.__grid(min_value, max_value)
+            val_center: np.ndarray = mf.get_values(pt_center)
+            if weights is None:
+                numerator: float = float(np.sum(pt_center * val_center))
+                denominator: float = float(np.sum(val_center))
+                return round(numerator / denominator, 8) if denominator != 0 else 0.0
+            numerator: float = float(np.sum(pt_center * weights * val_center))
+            denominator: float = float(np.sum(weights * val_center))
+            return numerator / denominator if denominator != 0 else 0.0
+        elif self.def_method in (DefazzificationMethod.BISECTOR,
+                                 DefazzificationMethod.AVERAGE_MAXIMUM,
+                                 DefazzificationMethod.SMALLEST_MAXIMUM,
+                                 DefazzificationMethod.LARGEST_MAXIMUM):
+            points, _ = self.__grid(min_value, max_value)
+            return float(defuzzify_sampled(self.def_method, points, mf.get_values(points)))
         else:
             raise Exception(f'Метод дефаззификации {self.def_method} не реализован')
\ No newline at end of file
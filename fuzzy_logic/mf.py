@@ -4,16 +4,85 @@ Luferov Victor <lyferov@yandex.ru>
 Membership functions
 """
 
-from typing import List, Tuple
+from typing import List, Tuple, Callable
 from abc import ABC, abstractmethod
 import numpy as np
 from .types import MfCompositionType
+from .tracked_list import next_version
+
+_parameters_version: int = next_version()
+
+
+def parameters_version() -> int:
+    """
+    Version of parameters of all mf. It changes when a parameter of existing mf is assigned or mf of a term
+    is replaced, so data built from parameters of mf may be keyed by it
+    :return: version
+    """
+    return _parameters_version
+
+
+def touch_parameters():
+    """
+    Mark parameters of mf as changed
+    """
+    global _parameters_version
+    _parameters_version = next_version()
+
+
+def triangular_values(params: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """
+    Values of several triangular MF
+    :param params: array (terms x 3) of x1, x2, x3
+    :param x: array of points
+    :return: array (terms x *x.shape)
+    """
+    x = np.asarray(x, dtype=float)
+    x1, x2, x3 = (params[:, i].reshape((-1,) + (1,) * x.ndim) for i in range(3))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result: np.ndarray = np.where((x1 < x) & (x < x2), x / (x2 - x1) - x1 / (x2 - x1), 0.0)
+        result = np.where((x2 < x) & (x < x3), -x / (x3 - x2) + x3 / (x3 - x2), result)
+    return np.where(x == x2, 1.0, result)
+
+
+def trapezoid_values(params: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """
+    Values of several trapezoid MF
+    :param params: array (terms x 4) of x1, x2, x3, x4
+    :param x: array of points
+    :return: array (terms x *x.shape)
+    """
+    x = np.asarray(x, dtype=float)
+    x1, x2, x3, x4 = (params[:, i].reshape((-1,) + (1,) * x.ndim) for i in range(4))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result: np.ndarray = np.where((x1 < x) & (x < x2), x / (x2 - x1) - x1 / (x2 - x1), 0.0)
+        result = np.where((x3 < x) & (x < x4), -x / (x4 - x3) + x4 / (x4 - x3), result)
+    return np.where((x2 <= x) & (x <= x3), 1.0, result)
+
+
+def normal_values(params: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """
+    Values of several normal MF
+    :param params: array (terms x 2) of b, sigma
+    :param x: array of points
+    :return: array (terms x *x.shape)
+    """
+    x = np.asarray(x, dtype=float)
+    b, sigma = (params[:, i].reshape((-1,) + (1,) * x.ndim) for i in range(2))
+    return np.exp(-(x - b) ** 2 / (2 * sigma ** 2))
 
 
 class MembershipFunction(ABC):
     """
     Abstract class of MF
     """
+    __slots__ = ()
+
+    def __setattr__(self, name: str, value):
+        if not name.startswith('_') and hasattr(self, name):
+            touch_parameters()
+        super().__setattr__(name, value)
+
     @property
     @abstractmethod
     def sup(self) -> float:
@@ -23,24 +92,72 @@ class MembershipFunction(ABC):
     def get_value(self, x: float) -> float:
         ...
 
+    def get_values(self, x: np.ndarray) -> np.ndarray:
+        """
+        Get values of mf for array of points
+        :param x: array of points
+        :return: array of values with the shape of x
+        """
+        x = np.asarray(x, dtype=float)
+        return np.fromiter((self.get_value(v) for v in x.ravel()), float, x.size).reshape(x.shape)
+
+    @property
+    def support(self) -> Tuple[float, float]:
+        """
+        Interval out of which mf is equal to zero
+        :return: left and right bounds of interval
+        """
+        return -np.inf, np.inf
 
-class NormalMF(MembershipFunction):
-    def __init__(self, b: float, sigma: float):
-        self.b: float = b
-        self.sigma: float = sigma
+
+class NormalShape(MembershipFunction):
+    """
+    Normal MF given by b, sigma and truncation of subclass
+
+    The support is infinite by default. With truncation = k the support is [b - k * sigma, b + k * sigma],
+    so fuzzification treats the values out of it as zero.
+    """
+    __slots__ = ()
+    b: float
+    sigma: float
+    truncation: float
 
     def get_value(self, x: float) -> float:
         return np.exp(-(x - self.b) ** 2 / (2 * self.sigma ** 2))
 
+    def get_values(self, x: np.ndarray) -> np.ndarray:
+        return normal_values(np.array([[self.b, self.sigma]], dtype=float), x)[0]
+
+    @property
+    def support(self) -> Tuple[float, float]:
+        if np.isinf(self.truncation):
+            return -np.inf, np.inf
+        return self.b - self.truncation * abs(self.sigma), self.b + self.truncation * abs(self.sigma)
+
     @property
     def sup(self) -> float:
         return 1.0
 
 
+class NormalMF(NormalShape):
+    """
+    Normal MF
+    """
+    __slots__ = ('b', 'sigma', 'truncation')
+
+    def __init__(self, b: float, sigma: float, truncation: float = np.inf):
+        if truncation <= 0:
+            raise ValueError(f'0 < {truncation} is not True')
+        self.b: float = b
+        self.sigma: float = sigma
+        self.truncation: float = truncation
+
+
 class ConstantMF(MembershipFunction):
     """
     Singletone MF
     """
+    __slots__ = ('value',)
 
     def __init__(self, value: float):
         if not 0.0 <= value <= 1:
@@ -50,6 +167,9 @@ class ConstantMF(MembershipFunction):
     def get_value(self, x: float) -> float:
         return self.value
 
+    def get_values(self, x: np.ndarray) -> np.ndarray:
+        return np.full(np.shape(x), self.value, dtype=float)
+
     @property
     def sup(self) -> float:
         return 1.0
@@ -58,25 +178,63 @@ class ConstantMF(MembershipFunction):
 class PointsMF(MembershipFunction):
     """
     Points MF
+
+    Piecewise linear MF given by the table of points (x, y). Points are sorted once and kept in contiguous
+    arrays, the value is found by binary search. Outside of the table the MF keeps the value of the edge point.
     """
+    __slots__ = ('xs', 'ys', '__sup')
+
     def __init__(self, points: List[Tuple[float, float]]):
-        self.points: List[Tuple[float, float]] = points
+        if len(points) == 0:
+            raise ValueError('At least one point is required')
+        table: np.ndarray = np.array(points, dtype=float).reshape(-1, 2)
+        table = table[np.argsort(table[:, 0], kind='stable')]
+        if not np.all(np.isfinite(table)):
+            raise ValueError('Points must be finite')
+        if np.any(np.diff(table[:, 0]) <= 0):
+            raise ValueError('x of points must be unique')
+        if np.any(table[:, 1] < 0) or np.any(table[:, 1] > 1):
+            raise ValueError('0.0 <= y <= 1.0 is not True for all points')
+        # Points are validated once, so the arrays are read only
+        self.xs: np.ndarray = np.ascontiguousarray(table[:, 0])
+        self.ys: np.ndarray = np.ascontiguousarray(table[:, 1])
+        self.xs.flags.writeable = False
+        self.ys.flags.writeable = False
+        self.__sup: float = float(np.max(self.ys))
+
+    @property
+    def points(self) -> List[Tuple[float, float]]:
+        return list(zip(self.xs.tolist(), self.ys.tolist()))
+
+    @property
+    def support(self) -> Tuple[float, float]:
+        positive: np.ndarray = np.nonzero(self.ys > 0)[0]
+        if len(positive) == 0:
+            return float(self.xs[0]), float(self.xs[0])
+        left: float = -np.inf if positive[0] == 0 else float(self.xs[positive[0] - 1])
+        right: float = np.inf if positive[-1] == len(self.ys) - 1 else float(self.xs[positive[-1] + 1])
+        return left, right
 
     def get_value(self, x: float) -> float:
-        pass
+        return float(np.interp(x, self.xs, self.ys))
 
+    def get_values(self, x: np.ndarray) -> np.ndarray:
+        return np.interp(np.asarray(x, dtype=float), self.xs, self.ys)
 
-class TriangularMF(MembershipFunction):
+    @property
+    def sup(self) -> float:
+        return self.__sup
+
+
+class TriangularShape(MembershipFunction):
     """
-    Triangular MF
+    Triangular MF given by x1, x2, x3 of subclass
     """
 
-    def __init__(self, x1: float, x2: float, x3: float):
-        if not (x1 <= x2 <= x3):
-            raise ValueError(f'{x1} <= {x2} <= {x3} is not True')
-        self.x1: float = x1
-        self.x2: float = x2
-        self.x3: float = x3
+    __slots__ = ()
+    x1: float
+    x2: float
+    x3: float
 
     def get_value(self, x: float) -> float:
         """
@@ -84,35 +242,61 @@ class TriangularMF(MembershipFunction):
         :param x: point of x
         :return: value of mf
         """
-        if self.x1 == self.x2 == x or self.x2 == self.x3 == x or self.x2 == x:
+        x1, x2, x3 = self.x1, self.x2, self.x3
+        if x1 == x2 == x or x2 == x3 == x or x2 == x:
             return 1.0
-        elif self.x1 < x < self.x2:
-            return x / (self.x2 - self.x1) - self.x1 / (self.x2 - self.x1)
-        elif self.x2 < x < self.x3:
-            return -x / (self.x3 - self.x2) + self.x3 / (self.x3 - self.x2)
+        elif x1 < x < x2:
+            return x / (x2 - x1) - x1 / (x2 - x1)
+        elif x2 < x < x3:
+            return -x / (x3 - x2) + x3 / (x3 - x2)
         else:
             return 0.0
 
+    def get_values(self, x: np.ndarray) -> np.ndarray:
+        """
+        Get values of mf for array of points
+        :param x: array of points
+        :return: array of values with the shape of x
+        """
+        return triangular_values(np.array([[self.x1, self.x2, self.x3]], dtype=float), x)[0]
+
     def to_normal(self) -> NormalMF:
         return NormalMF(self.x2, (self.x3 - self.x1) / 5.0)
 
+    @property
+    def support(self) -> Tuple[float, float]:
+        return self.x1, self.x3
+
     @property
     def sup(self) -> float:
         return 1.0
 
 
-class TrapezoidMF(MembershipFunction):
+class TriangularMF(TriangularShape):
     """
-    Trapezoid MF
+    Triangular MF
     """
 
-    def __init__(self, x1: float, x2: float, x3: float, x4: float):
-        if not (x1 <= x2 <= x3 <= x4):
-            raise ValueError(f'{x1} <= {x2} <= {x3} <= {x4} is not True')
+    __slots__ = ('x1', 'x2', 'x3')
+
+    def __init__(self, x1: float, x2: float, x3: float):
+        if not (x1 <= x2 <= x3):
+            raise ValueError(f'{x1} <= {x2} <= {x3} is not True')
         self.x1: float = x1
         self.x2: float = x2
         self.x3: float = x3
-        self.x4: float = x4
+
+
+class TrapezoidShape(MembershipFunction):
+    """
+    Trapezoid MF given by x1, x2, x3, x4 of subclass
+    """
+
+    __slots__ = ()
+    x1: float
+    x2: float
+    x3: float
+    x4: float
 
     def get_value(self, x: float) -> float:
         """
@@ -120,28 +304,60 @@ class TrapezoidMF(MembershipFunction):
         :param x: point of x
         :return: value of mf
         """
-        if self.x1 == self.x2 == x or self.x3 == self.x4 == x or self.x2 <= x <= self.x3:
+        x1, x2, x3, x4 = self.x1, self.x2, self.x3, self.x4
+        if x1 == x2 == x or x3 == x4 == x or x2 <= x <= x3:
             return float(1)
-        elif self.x1 < x < self.x2:
-            return float(x / (self.x2 - self.x1) - self.x1 / (self.x2 - self.x1))
-        elif self.x3 < x < self.x4:
-            return float(-x / (self.x4 - self.x3) + self.x4 / (self.x4 - self.x3))
+        elif x1 < x < x2:
+            return float(x / (x2 - x1) - x1 / (x2 - x1))
+        elif x3 < x < x4:
+            return float(-x / (x4 - x3) + x4 / (x4 - x3))
         else:
             return float(0)
 
+    def get_values(self, x: np.ndarray) -> np.ndarray:
+        """
+        Get values of mf for array of points
+        :param x: array of points
+        :return: array of values with the shape of x
+        """
+        return trapezoid_values(np.array([[self.x1, self.x2, self.x3, self.x4]], dtype=float), x)[0]
+
+    @property
+    def support(self) -> Tuple[float, float]:
+        return self.x1, self.x4
+
     @property
     def sup(self) -> float:
         return 1
 
 
+class TrapezoidMF(TrapezoidShape):
+    """
+    Trapezoid MF
+    """
+
+    __slots__ = ('x1', 'x2', 'x3', 'x4')
+
+    def __init__(self, x1: float, x2: float, x3: float, x4: float):
+        if not (x1 <= x2 <= x3 <= x4):
+            raise ValueError(f'{x1} <= {x2} <= {x3} <= {x4} is not True')
+        self.x1: float = x1
+        self.x2: float = x2
+        self.x3: float = x3
+        self.x4: float = x4
+
+
 class CompositeMF(MembershipFunction):
     """
     Composite  MF
     """
 
+    __slots__ = ('composite_type', 'mfs', '__compiled')
+
     def __init__(self, composite_type: MfCompositionType, *mfs: MembershipFunction):
         self.composite_type: MfCompositionType = composite_type
         self.mfs = mfs
+        self.__compiled: [Tuple[tuple, Callable[[np.ndarray], np.ndarray]], None] = None
 
     def __compose(self, x: List[float]) -> float:
         if self.composite_type == MfCompositionType.MAX:
@@ -154,10 +370,389 @@ class CompositeMF(MembershipFunction):
             return float(np.prod(x) - np.sum(x))
         else:
             raise ValueError(f'Type of composition {self.composite_type} is not found!')
-    
+
+    def __compose_rows(self, values: np.ndarray) -> np.ndarray:
+        if self.composite_type == MfCompositionType.MAX:
+            return np.max(values, axis=0)
+        elif self.composite_type == MfCompositionType.MIN:
+            return np.min(values, axis=0)
+        elif self.composite_type == MfCompositionType.PROD:
+            return np.prod(values, axis=0)
+        elif self.composite_type == MfCompositionType.SUM:
+            return np.prod(values, axis=0) - np.sum(values, axis=0)
+        else:
+            raise ValueError(f'Type of composition {self.composite_type} is not found!')
+
+    def __signature(self) -> tuple:
+        """
+        Structure of composition with identities of operands and the parameters fixed by compile
+        """
+        operands: List[tuple] = []
+        for mf in self.mfs:
+            if isinstance(mf, CompositeMF):
+                operands.append(mf.__signature())
+            elif type(mf) is TriangularMF:
+                operands.append((id(mf), mf.x1, mf.x2, mf.x3))
+            elif type(mf) is TrapezoidMF:
+                operands.append((id(mf), mf.x1, mf.x2, mf.x3, mf.x4))
+            elif isinstance(mf, ConstantMF):
+                operands.append((id(mf), mf.value))
+            else:
+                operands.append((id(mf),))
+        return self.composite_type, tuple(operands)
+
     def get_value(self, x: float) -> float:
         return self.__compose([mf.get_value(x) for mf in self.mfs])
 
+    def get_values(self, x: np.ndarray) -> np.ndarray:
+        """
+        Values by the compiled evaluator, it is compiled anew when operands or their parameters change
+        :param x: array of points
+        :return: array of values with the shape of x
+        """
+        signature: tuple = self.__signature()
+        if self.__compiled is None or self.__compiled[0] != signature:
+            self.__compiled = (signature, self.compile())
+        return self.__compiled[1](x)
+
+    def flatten(self) -> List[MembershipFunction]:
+        """
+        Operands of composition, nested compositions of the same type are expanded
+        :return: list of operands
+        """
+        if self.composite_type == MfCompositionType.SUM:
+            return list(self.mfs)
+        operands: List[MembershipFunction] = []
+        for mf in self.mfs:
+            if isinstance(mf, CompositeMF) and mf.composite_type == self.composite_type:
+                operands.extend(mf.flatten())
+            else:
+                operands.append(mf)
+        return operands
+
+    def compile(self) -> Callable[[np.ndarray], np.ndarray]:
+        """
+        Compile composition into one array evaluator.
+        Nested compositions of the same type are flattened and constant operands are folded.
+        Operands like MIN(constant, mf) or PROD(constant, mf) become rows of one (terms x points) array
+        with a per row clipping level or scale, then the rows are reduced at once.
+        Triangular and trapezoid rows are evaluated together from arrays of their parameters,
+        so parameters of operands are fixed at the moment of compilation.
+        :return: function of array of points
+        """
+        operands: List[MembershipFunction] = self.flatten()
+        constant: [float, None] = None
+        if self.composite_type != MfCompositionType.SUM:
+            constants: List[float] = [mf.value for mf in operands if isinstance(mf, ConstantMF)]
+            if len(constants) > 0:
+                operands = [mf for mf in operands if not isinstance(mf, ConstantMF)]
+                constant = float(self.__compose_rows(np.array(constants)))
+        rows: List[MembershipFunction] = []
+        clip: List[float] = []
+        scale: List[float] = []
+        for mf in operands:
+            row, level, factor = mf, np.inf, 1.0
+            if isinstance(mf, CompositeMF) and mf.composite_type in (MfCompositionType.MIN, MfCompositionType.PROD):
+                inner: List[MembershipFunction] = mf.flatten()
+                inner_constants: List[float] = [c.value for c in inner if isinstance(c, ConstantMF)]
+                inner_others: List[MembershipFunction] = [c for c in inner if not isinstance(c, ConstantMF)]
+                if len(inner_others) == 1 and len(inner_constants) > 0:
+                    row = inner_others[0]
+                    if mf.composite_type == MfCompositionType.MIN:
+                        level = min(inner_constants)
+                    else:
+                        factor = float(np.prod(inner_constants))
+            rows.append(row)
+            clip.append(level)
+            scale.append(factor)
+        levels: [np.ndarray, None] = np.array(clip) if np.any(np.isfinite(clip)) else None
+        factors: [np.ndarray, None] = np.array(scale) if np.any(np.array(scale) != 1.0) else None
+        if len(rows) == 0 and constant is None:
+            raise ValueError('Composition without operands')
+        triangular: np.ndarray = np.array([i for i, mf in enumerate(rows) if type(mf) is TriangularMF], dtype=int)
+        triangular_params: np.ndarray = np.array([[rows[i].x1, rows[i].x2, rows[i].x3] for i in triangular],
+                                                 dtype=float).reshape(-1, 3)
+        trapezoid: np.ndarray = np.array([i for i, mf in enumerate(rows) if type(mf) is TrapezoidMF], dtype=int)
+        trapezoid_params: np.ndarray = np.array([[rows[i].x1, rows[i].x2, rows[i].x3, rows[i].x4] for i in trapezoid],
+                                                dtype=float).reshape(-1, 4)
+        others: List[int] = [i for i, mf in enumerate(rows) if type(mf) not in (TriangularMF, TrapezoidMF)]
+
+        def evaluate(x: np.ndarray) -> np.ndarray:
+            x = np.asarray(x, dtype=float)
+            if len(rows) == 0:
+                return np.full(x.shape, constant)
+            values: np.ndarray = np.empty((len(rows),) + x.shape)
+            if len(triangular) > 0:
+                values[triangular] = triangular_values(triangular_params, x)
+            if len(trapezoid) > 0:
+                values[trapezoid] = trapezoid_values(trapezoid_params, x)
+            for i in others:
+                values[i] = rows[i].get_values(x)
+            shape: Tuple[int, ...] = (-1,) + (1,) * x.ndim
+            if levels is not None:
+                np.minimum(values, levels.reshape(shape), out=values)
+            if factors is not None:
+                values *= factors.reshape(shape)
+            result: np.ndarray = self.__compose_rows(values)
+            if constant is not None:
+                result = self.__compose_rows(np.array([result, np.full(x.shape, constant)]))
+            return result
+
+        return evaluate
+
+    @property
+    def support(self) -> Tuple[float, float]:
+        supports: List[Tuple[float, float]] = [mf.support for mf in self.mfs]
+        if len(supports) == 0:
+            return -np.inf, np.inf
+        if self.composite_type in (MfCompositionType.MIN, MfCompositionType.PROD):
+            return max(left for left, _ in supports), min(right for _, right in supports)
+        return min(left for left, _ in supports), max(right for _, right in supports)
+
     @property
     def sup(self) -> float:
         return 1.0
+
+
+class TabulatedMF(MembershipFunction):
+    """
+    Tabulated MF
+
+    Wrapped mf is sampled once on [min_value, max_value] and then evaluated by table lookup with linear
+    interpolation in constant time. Out of the range the edge values of the table are used.
+    max_error is the largest deviation from the wrapped mf measured inside the table steps on building.
+    """
+
+    __slots__ = ('mf', 'min_value', 'max_value', 'resolution', 'xs', 'ys', 'max_error', '__values', '__scale')
+
+    def __init__(self, mf: MembershipFunction, min_value: float, max_value: float, resolution: int = 1001):
+        if min_value >= max_value:
+            raise ValueError(f'{min_value} < {max_value} is not True')
+        if resolution < 2:
+            raise ValueError(f'2 <= {resolution} is not True')
+        self.mf: MembershipFunction = mf
+        self.min_value: float = min_value
+        self.max_value: float = max_value
+        self.resolution: int = resolution
+        self.xs: np.ndarray = np.linspace(min_value, max_value, resolution)
+        self.ys: np.ndarray = np.asarray(mf.get_values(self.xs), dtype=float)
+        self.__values: List[float] = self.ys.tolist()
+        self.__scale: float = (resolution - 1) / (max_value - min_value)
+        # Ошибка измеряется в четвертях каждого шага таблицы
+        fractions: np.ndarray = np.array([.25, .5, .75])
+        points: np.ndarray = (self.xs[:-1, np.newaxis] + fractions * (self.xs[1] - self.xs[0])).ravel()
+        self.max_error: float = float(np.max(np.abs(self.get_values(points) - mf.get_values(points))))
+
+    def get_value(self, x: float) -> float:
+        t: float = (x - self.min_value) * self.__scale
+        values: List[float] = self.__values
+        if t <= 0:
+            return values[0]
+        if t >= self.resolution - 1:
+            return values[-1]
+        i: int = int(t)
+        return values[i] + (values[i + 1] - values[i]) * (t - i)
+
+    def get_values(self, x: np.ndarray) -> np.ndarray:
+        t: np.ndarray = np.clip((np.asarray(x, dtype=float) - self.min_value) * self.__scale, 0, self.resolution - 1)
+        i: np.ndarray = np.minimum(t.astype(int), self.resolution - 2)
+        return np.where(t >= self.resolution - 1, self.ys[-1], self.ys[i] + (self.ys[i + 1] - self.ys[i]) * (t - i))
+
+    @property
+    def support(self) -> Tuple[float, float]:
+        return self.mf.support
+
+    @property
+    def sup(self) -> float:
+        return self.mf.sup
+
+
+class MembershipFunctionBank(ABC):
+    """
+    Bank of MF of the same kind.
+    Parameters of all terms are stored in one array (terms x parameters) and evaluated together,
+    mf of every term is a view of its row, so changing parameters of mf changes the array.
+    The array is read only, parameters are changed by mf of terms or set_parameter.
+    """
+    __slots__ = ('params', '__data')
+    width: int = 0  # Number of parameters of one mf
+
+    def __init__(self, params: np.ndarray):
+        params = np.array(params, dtype=float)
+        if params.ndim != 2 or params.shape[1] != self.width:
+            raise ValueError(f'Shape of parameters {params.shape} is not (terms x {self.width})')
+        self.__data: np.ndarray = params
+        self.params: np.ndarray = params.view()
+        self.params.flags.writeable = False
+
+    def set_parameter(self, i: int, column: int, value: float):
+        """
+        Change parameter of mf
+        :param i: index of term
+        :param column: column of parameter
+        :param value: new value
+        """
+        self.__data[i, column] = value
+        touch_parameters()
+
+    def __len__(self) -> int:
+        return self.params.shape[0]
+
+    @abstractmethod
+    def get_values(self, x: np.ndarray) -> np.ndarray:
+        """
+        Values of all mf
+        :param x: array of points
+        :return: array (terms x *x.shape)
+        """
+        ...
+
+    @property
+    @abstractmethod
+    def supports(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :return: left and right bounds of supports of all mf
+        """
+        ...
+
+    @abstractmethod
+    def mf(self, i: int) -> MembershipFunction:
+        """
+        :param i: index of term
+        :return: mf of term i, a view of row i
+        """
+        ...
+
+
+def bank_parameter(column: int) -> property:
+    """
+    Parameter of mf stored in the bank
+    :param column: column of parameter in the bank
+    :return: property
+    """
+    def getter(self) -> float:
+        return float(self.bank.params[self.index, column])
+
+    def setter(self, value: float):
+        self.bank.set_parameter(self.index, column, value)
+
+    return property(getter, setter)
+
+
+class TriangularBankMF(TriangularShape):
+    """
+    Triangular MF stored in TriangularBank
+    """
+    __slots__ = ('bank', 'index')
+    x1 = bank_parameter(0)
+    x2 = bank_parameter(1)
+    x3 = bank_parameter(2)
+
+    def __init__(self, bank: 'TriangularBank', index: int):
+        self.bank: TriangularBank = bank
+        self.index: int = index
+
+
+class TrapezoidBankMF(TrapezoidShape):
+    """
+    Trapezoid MF stored in TrapezoidBank
+    """
+    __slots__ = ('bank', 'index')
+    x1 = bank_parameter(0)
+    x2 = bank_parameter(1)
+    x3 = bank_parameter(2)
+    x4 = bank_parameter(3)
+
+    def __init__(self, bank: 'TrapezoidBank', index: int):
+        self.bank: TrapezoidBank = bank
+        self.index: int = index
+
+
+class NormalBankMF(NormalShape):
+    """
+    Normal MF stored in NormalBank
+    """
+    __slots__ = ('bank', 'index')
+    b = bank_parameter(0)
+    sigma = bank_parameter(1)
+
+    def __init__(self, bank: 'NormalBank', index: int):
+        self.bank: NormalBank = bank
+        self.index: int = index
+
+    @property
+    def truncation(self) -> float:
+        return self.bank.truncation
+
+
+class TriangularBank(MembershipFunctionBank):
+    """
+    Bank of triangular MF, parameters (terms x 3): x1, x2, x3
+    """
+    __slots__ = ()
+    width: int = 3
+
+    def __init__(self, params: np.ndarray):
+        super().__init__(params)
+        if not np.all((self.params[:, 0] <= self.params[:, 1]) & (self.params[:, 1] <= self.params[:, 2])):
+            raise ValueError('x1 <= x2 <= x3 is not True for all terms')
+
+    def get_values(self, x: np.ndarray) -> np.ndarray:
+        return triangular_values(self.params, x)
+
+    @property
+    def supports(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self.params[:, 0], self.params[:, 2]
+
+    def mf(self, i: int) -> TriangularBankMF:
+        return TriangularBankMF(self, i)
+
+
+class TrapezoidBank(MembershipFunctionBank):
+    """
+    Bank of trapezoid MF, parameters (terms x 4): x1, x2, x3, x4
+    """
+    __slots__ = ()
+    width: int = 4
+
+    def __init__(self, params: np.ndarray):
+        super().__init__(params)
+        if not np.all(np.diff(self.params, axis=1) >= 0):
+            raise ValueError('x1 <= x2 <= x3 <= x4 is not True for all terms')
+
+    def get_values(self, x: np.ndarray) -> np.ndarray:
+        return trapezoid_values(self.params, x)
+
+    @property
+    def supports(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self.params[:, 0], self.params[:, 3]
+
+    def mf(self, i: int) -> TrapezoidBankMF:
+        return TrapezoidBankMF(self, i)
+
+
+class NormalBank(MembershipFunctionBank):
+    """
+    Bank of normal MF, parameters (terms x 2): b, sigma
+    """
+    __slots__ = ('truncation',)
+    width: int = 2
+
+    def __init__(self, params: np.ndarray, truncation: float = np.inf):
+        if truncation <= 0:
+            raise ValueError(f'0 < {truncation} is not True')
+        super().__init__(params)
+        self.truncation: float = truncation
+
+    def get_values(self, x: np.ndarray) -> np.ndarray:
+        return normal_values(self.params, x)
+
+    @property
+    def supports(self) -> Tuple[np.ndarray, np.ndarray]:
+        if np.isinf(self.truncation):
+            return np.full(len(self), -np.inf), np.full(len(self), np.inf)
+        half: np.ndarray = self.truncation * np.abs(self.params[:, 1])
+        return self.params[:, 0] - half, self.params[:, 0] + half
+
+    def mf(self, i: int) -> NormalBankMF:
+        return NormalBankMF(self, i)
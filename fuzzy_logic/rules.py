@@ -15,6 +15,7 @@ class SingleCondition:
     FuzzyVariable - Term
     SugenoVariable - SugenoFunction
     """
+    __slots__ = ('variable', 'term', 'not_')
 
     def __init__(self, variable: [FuzzyVariable, SugenoVariable], term: [Term, SugenoFunction], not_: bool = False):
         self.variable: [FuzzyVariable, SugenoVariable] = variable
@@ -23,6 +24,7 @@ class SingleCondition:
 
 
 class Conditions:
+    __slots__ = ('conditions', 'op', '__not')
 
     def __init__(self, conditions: [List, None] = None, op: OperatorType = OperatorType.AND, not_: bool = False):
         self.conditions: List = conditions if conditions is not None else []
@@ -38,6 +40,7 @@ class FuzzyCondition(SingleCondition):
     """
     Fuzzy rule
     """
+    __slots__ = ('hedge',)
 
     def __init__(self,
                  variable: [FuzzyVariable, SugenoVariable],
@@ -59,6 +62,7 @@ class FuzzyRule:
          - Нечеткое заключение conclusion для Mamdani
             conclusion: SingleConclusion = SingleConclusion(FuzzyVariable, Term, not?)
     """
+    __slots__ = ('condition', 'conclusion', 'weight')
 
     def __init__(self, condition: Conditions, conclusion: SingleCondition, weight: float = 1.):
         """
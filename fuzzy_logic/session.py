@@ -0,0 +1,187 @@
+"""
+Luferov Victor <lyferov@yandex.ru>
+
+Incremental evaluation of fuzzy systems
+"""
+
+from typing import List, Dict, Tuple, Set
+import numpy as np
+from .variables import FuzzyVariable, SugenoVariable, SugenoFunction
+from .rules import FuzzyRule, Conditions, FuzzyCondition
+from .compiled_rules import CompiledRules
+
+
+def rule_variables(condition: [Conditions, FuzzyCondition]) -> Set[FuzzyVariable]:
+    """
+    :return: input variables referenced by condition of rule
+    """
+    if isinstance(condition, FuzzyCondition):
+        return {condition.variable}
+    if isinstance(condition, Conditions):
+        return set().union(*[rule_variables(c) for c in condition.conditions])
+    raise Exception('Не найдено условие в нечетком правиле')
+
+
+class EvaluationSession:
+    """
+    Stateful evaluation of fuzzy system for a stream of inputs where only some of them change between calls.
+
+    Term values and firing strengths of the last call are kept. On update only changed variables are fuzzified
+    and only rules referencing them are evaluated, rules of every set of changed variables are compiled once.
+    Result is identical to calculate of the same values without cache. The session starts over when
+    the state of the system changes, see GenericFuzzySystem.state_key.
+    """
+
+    def __init__(self, system, input_values: Dict[FuzzyVariable, float]):
+        """
+        :param system: fuzzy system with calculate_strengths
+        :param input_values: values of all input variables
+        """
+        self.system = system
+        self.values: Dict[FuzzyVariable, float] = {}
+        self.result: dict = {}
+        self.strengths: np.ndarray = np.zeros(0)
+        self.__state: [tuple, None] = None
+        self.__mu: np.ndarray = np.zeros(0)
+        self.__dependencies: Dict[FuzzyVariable, List[int]] = {}
+        self.__compiled: Dict[frozenset, Tuple[np.ndarray, CompiledRules]] = {}
+        self.update(input_values)
+
+    def update(self, input_values: Dict[FuzzyVariable, float]) -> dict:
+        """
+        Calculate system after change of some inputs
+        :param input_values: new values of changed input variables, the rest keep their values
+        :return: values of output variables
+        """
+        state: tuple = self.system.state_key()
+        if state != self.__state:
+            values: Dict[FuzzyVariable, float] = dict(self.values)
+            values.update(input_values)
+            self.__start(state, values)
+            return dict(self.result)
+        changed: Dict[FuzzyVariable, float] = {}
+        for variable, value in input_values.items():
+            if variable not in self.values:
+                raise Exception(f'Переменная {variable.name} не является входной')
+            if not variable.min_value <= value <= variable.max_value:
+                raise Exception('Значние переменной выходит за диапазон')
+            if self.values[variable] != value:
+                changed[variable] = value
+        if len(changed) == 0:
+            return dict(self.result)
+        self.values.update(changed)
+        compiled: CompiledRules = self.system.compile_rules()
+        for variable, value in changed.items():
+            offset: int = compiled.offsets[variable]
+            positions: Dict = compiled.positions[variable]
+            self.__mu[offset:offset + len(variable.terms)] = .0
+            for term, mu in variable.fuzzify(value).items():
+                position: [int, None] = positions.get(term)
+                if position is not None:
+                    self.__mu[offset + position] = mu
+        rules, subset = self.__rules(frozenset(changed))
+        previous: np.ndarray = self.strengths[rules]
+        fired, strengths = subset.evaluate_active(self.__mu)
+        self.strengths[rules] = .0
+        self.strengths[rules[fired]] = strengths
+        self.result = self.conclude(changed, rules, previous)
+        return dict(self.result)
+
+    def __start(self, state: tuple, values: Dict[FuzzyVariable, float]):
+        """
+        Full evaluation, dependencies of rules on variables are collected anew
+        """
+        if len(self.system.rules) == 0:
+            raise Exception('Должно быть как минимум одно правило')
+        self.system.validate_input_values(values)
+        compiled: CompiledRules = self.system.compile_rules()
+        self.values = values
+        self.__mu = compiled.membership_vector(self.system.fuzzify(values, False))
+        self.strengths = compiled.evaluate(self.__mu)
+        self.__dependencies = {variable: [] for variable in self.system.inp}
+        for i, rule in enumerate(self.system.rules):
+            for variable in rule_variables(rule.condition):
+                if variable in self.__dependencies:
+                    self.__dependencies[variable].append(i)
+        self.__compiled = {}
+        self.__state = state
+        self.result = self.conclude(None, np.arange(len(self.strengths)), np.zeros(len(self.strengths)))
+
+    def __rules(self, variables: frozenset) -> Tuple[np.ndarray, CompiledRules]:
+        """
+        :return: indices of rules referencing any of variables and compiled rules for them
+        """
+        if variables not in self.__compiled:
+            ids: List[int] = sorted(set().union(*[self.__dependencies[variable] for variable in variables]))
+            rules: List[FuzzyRule] = self.system.rules
+            if len(ids) == len(rules):
+                subset: CompiledRules = self.system.compile_rules()
+            else:
+                subset: CompiledRules = CompiledRules(
+                    [rules[i] for i in ids], self.system.inp, self.system.and_method, self.system.or_method
+                )
+            self.__compiled[variables] = (np.array(ids, dtype=int), subset)
+        return self.__compiled[variables]
+
+    def conclude(self, changed: [Dict[FuzzyVariable, float], None], rules: np.ndarray, previous: np.ndarray) -> dict:
+        """
+        Output values from firing strengths in self.strengths
+        :param changed: changed input values or None for full evaluation
+        :param rules: indices of reevaluated rules
+        :param previous: strengths of reevaluated rules before update
+        :return: values of output variables
+        """
+        return self.system.calculate_strengths(self.strengths)
+
+
+class SugenoSession(EvaluationSession):
+    """
+    Evaluation session of Sugeno system. By default fired rules are combined by combine_result with functions
+    evaluated on demand, as calculate does, so the result is identical to calculate. With exact=False sums of
+    weights per function are updated by deltas of reevaluated rules and only functions with fired rules are
+    evaluated, which costs the number of such functions instead of fired rules, but the result may differ
+    from calculate by rounding.
+    """
+
+    def __init__(self, system, input_values: Dict[FuzzyVariable, float], exact: bool = True):
+        """
+        :param system: Sugeno fuzzy system
+        :param input_values: values of all input variables
+        :param exact: combine fired rules as calculate does instead of updating sums by deltas
+        """
+        self.exact: bool = exact
+        self.__functions: List[Tuple[int, SugenoVariable, SugenoFunction]] = []
+        self.__columns: np.ndarray = np.zeros(0, dtype=int)
+        self.__weights: np.ndarray = np.zeros(0)
+        self.__counts: np.ndarray = np.zeros(0, dtype=int)
+        super().__init__(system, input_values)
+
+    def conclude(self, changed: [Dict[FuzzyVariable, float], None], rules: np.ndarray, previous: np.ndarray) -> dict:
+        fr: Dict[SugenoVariable, Dict[SugenoFunction, float]] = self.system.evaluate_functions(self.values, True)
+        if self.exact:
+            ids: np.ndarray = np.flatnonzero(self.strengths)
+            all_rules: List[FuzzyRule] = self.system.rules
+            return self.system.combine_result(
+                {all_rules[i]: weight for i, weight in zip(ids.tolist(), self.strengths[ids].tolist())}, fr
+            )
+        if changed is None:
+            self.__functions = [(j, variable, sf) for j, variable in enumerate(self.system.out)
+                                for sf in variable.functions]
+            self.__columns = self.system.rule_functions()[0]
+            self.__weights = np.bincount(self.__columns, self.strengths, minlength=len(self.__functions))
+            self.__counts = np.bincount(self.__columns, self.strengths != 0, minlength=len(self.__functions))
+        else:
+            current: np.ndarray = self.strengths[rules]
+            np.add.at(self.__weights, self.__columns[rules], current - previous)
+            np.add.at(self.__counts, self.__columns[rules], (current != 0).astype(int) - (previous != 0))
+            # Сумма без сработавших правил равна нулю точно, без накопленной ошибки округления
+            self.__weights[self.__counts == 0] = .0
+        out: List[SugenoVariable] = self.system.out
+        numerator: List[float] = [.0] * len(out)
+        denominator: List[float] = [.0] * len(out)
+        weights: List[float] = self.__weights.tolist()
+        for k in np.flatnonzero(self.__counts).tolist():
+            j, variable, sf = self.__functions[k]
+            numerator[j] += fr[variable][sf] * weights[k]
+            denominator[j] += weights[k]
+        return {variable: .0 if d == .0 else n / d for variable, n, d in zip(out, numerator, denominator)}
@@ -3,9 +3,11 @@ Luferov Victor <lyferov@yandex.ru>
 
 Sugeno Fuzzy System
 """
-from typing import Dict, List
+from typing import Dict, List, Sequence, Tuple
 from collections import defaultdict
+import numpy as np
 from .generic_fs import GenericFuzzySystem
+from .session import SugenoSession
 from .rules import FuzzyRule
 from .rule_parser import RuleParser
 from .variables import FuzzyVariable, SugenoVariable, SugenoFunction
@@ -13,11 +15,29 @@ from .terms import Term
 from .types import AndMethod, OrMethod
 
 
+class FunctionValues(dict):
+    """
+    Значения функций выходной переменной: функция вычисляется при первом обращении и запоминается
+    """
+
+    def __init__(self, iv: Dict[FuzzyVariable, float]):
+        """
+        :param iv: входные значения
+        """
+        super().__init__()
+        self.iv: Dict[FuzzyVariable, float] = iv
+
+    def __missing__(self, sf: SugenoFunction) -> float:
+        value: float = sf.evaluate(self.iv)
+        self[sf] = value
+        return value
+
+
 class SugenoFuzzySystem(GenericFuzzySystem):
 
     def __init__(self,
-                 inp: List[FuzzyVariable] = List[FuzzyVariable],
-                 out: List[SugenoVariable] = List[SugenoVariable],
+                 inp: List[FuzzyVariable] = None,
+                 out: List[SugenoVariable] = None,
                  am: AndMethod = AndMethod.PROD,
                  om: OrMethod = OrMethod.MAX):
         """
@@ -27,19 +47,19 @@ class SugenoFuzzySystem(GenericFuzzySystem):
         :param am: метод И
         :param om: метод ИЛИ
         """
-        self.out: List[SugenoVariable] = out
-        super().__init__(inp, am, om)
+        self.out: List[SugenoVariable] = out if out is not None else []
+        super().__init__(inp if inp is not None else [], am, om)
+        self.__rule_functions: [Tuple[tuple, np.ndarray, np.ndarray], None] = None
 
-    def output_by_name(self, name: str) -> SugenoVariable:
+    def state_key(self) -> tuple:
         """
-        Ищем выходную переменную по имени
-        :param name: имя переменной
-        :return: переменная "variable.SugenoVariable"
+        Состояние модели: дополнительно списки функций выходных переменных и их параметры
+        :return: ключ состояния
         """
-        for out in self.out:
-            if out.name == name:
-                return out
-        raise Exception(f'Выходной переменной с именем "{name}" не найдено')
+        return super().state_key() + (
+            tuple((variable.functions.version, tuple(function.parameters for function in variable.functions))
+                  for variable in self.out),
+        )
 
     def parse_rule(self, rule: str) -> FuzzyRule:
         """
@@ -49,8 +69,136 @@ class SugenoFuzzySystem(GenericFuzzySystem):
         """
         return RuleParser.parse(rule, self.inp, self.out)
 
-    def evaluate_functions(self, iv: Dict[FuzzyVariable, float]) -> Dict[SugenoVariable, Dict[SugenoFunction, float]]:
-        return {variable: {sf: sf.evaluate(iv) for sf in variable.functions} for variable in self.out}
+    def evaluate_functions(self,
+                           iv: Dict[FuzzyVariable, float],
+                           lazy: bool = False) -> Dict[SugenoVariable, Dict[SugenoFunction, float]]:
+        """
+        Вычисляем функции выходных переменных
+        :param iv: входные значения
+        :param lazy: функция вычисляется при первом обращении к ней и запоминается,
+            так combine_result вычисляет только функции сработавших правил
+        :return: значения функций каждой выходной переменной
+        """
+        if lazy:
+            return {variable: FunctionValues(iv) for variable in self.out}
+        values: List[float] = self.evaluate_function_vector(iv).tolist()
+        result: Dict[SugenoVariable, Dict[SugenoFunction, float]] = {}
+        offset: int = 0
+        for variable in self.out:
+            result[variable] = {sf: values[offset + i] for i, sf in enumerate(variable.functions)}
+            offset += len(variable.functions)
+        return result
+
+    def evaluate_function_vector(self, iv: Dict[FuzzyVariable, float]) -> np.ndarray:
+        """
+        Вычисляем функции выходных переменных. Линейные и постоянные функции переменной вычисляются одним
+        умножением матрицы коэффициентов на вектор входных значений, переменные только с постоянными функциями
+        не требуют вычислений
+        :param iv: входные значения
+        :return: вектор значений функций в порядке self.out и variable.functions
+        """
+        x: [np.ndarray, None] = None
+        result: List[np.ndarray] = []
+        for variable in self.out:
+            constants: [np.ndarray, None] = variable.constants
+            if constants is not None:
+                result.append(constants)
+                continue
+            if x is None:
+                x = np.array([1.] + [iv[input_variable] for input_variable in self.inp])
+            matrix, linear = variable.coefficient_matrix(self.inp)
+            values: np.ndarray = matrix @ x
+            for i in np.flatnonzero(~linear).tolist():
+                values[i] = variable.functions[i].evaluate(iv)
+            result.append(values)
+        return np.concatenate(result) if len(result) > 0 else np.zeros(0)
+
+    def evaluate_functions_batch(self, x: np.ndarray, needed: np.ndarray = None) -> np.ndarray:
+        """
+        Вычисляем функции выходных переменных для матрицы входных значений.
+        Линейные и постоянные функции переменной вычисляются одним матричным произведением
+        :param x: матрица входных значений (образцы x входные переменные) в порядке self.inp
+        :param needed: маска вычисляемых функций, значения остальных равны нулю, None - все функции
+        :return: матрица значений функций (образцы x функции) в порядке self.out и variable.functions
+        """
+        x1: np.ndarray = np.column_stack([np.ones(x.shape[0]), x])
+        result: List[np.ndarray] = []
+        offset: int = 0
+        for variable in self.out:
+            count: int = len(variable.functions)
+            mask: np.ndarray = np.ones(count, dtype=bool) if needed is None else needed[offset:offset + count]
+            offset += count
+            constants: [np.ndarray, None] = variable.constants
+            if constants is not None:
+                result.append(np.broadcast_to(constants, (x.shape[0], count)))
+                continue
+            matrix, linear = variable.coefficient_matrix(self.inp)
+            values: np.ndarray = np.zeros((x.shape[0], count))
+            packed: np.ndarray = np.flatnonzero(linear & mask)
+            if len(packed) > 0:
+                values[:, packed] = x1 @ matrix[packed].T
+            for i in np.flatnonzero(~linear & mask).tolist():
+                values[:, i] = variable.functions[i].evaluate_values(self.inp, x)
+            result.append(values)
+        return np.hstack(result) if len(result) > 0 else np.zeros((x.shape[0], 0))
+
+    def function_constants(self) -> [np.ndarray, None]:
+        """
+        Значения функций, если все функции выходных переменных постоянные (модель нулевого порядка)
+        :return: вектор значений в порядке self.out и variable.functions или None
+        """
+        constants: List[np.ndarray] = [variable.constants for variable in self.out]
+        if any(values is None for values in constants):
+            return None
+        return np.concatenate(constants) if len(constants) > 0 else np.zeros(0)
+
+    def rule_functions(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Функция заключения и выходная переменная каждого правила.
+        Пересчитываются при изменении списков rules, out или функций выходных переменных
+        :return: векторы индексов функций (в порядке self.out и variable.functions) и выходных переменных
+            в порядке self.rules
+        """
+        key: tuple = (self.rules.version, self.out.version, tuple(variable.functions.version for variable in self.out))
+        if self.__rule_functions is None or self.__rule_functions[0] != key:
+            columns: Dict[SugenoVariable, Dict[SugenoFunction, int]] = {}
+            offset: int = 0
+            for variable in self.out:
+                columns[variable] = {sf: offset + i for i, sf in reversed(list(enumerate(variable.functions)))}
+                offset += len(variable.functions)
+            outputs: Dict[SugenoVariable, int] = {variable: j for j, variable in reversed(list(enumerate(self.out)))}
+            rule_columns: np.ndarray = np.empty(len(self.rules), dtype=int)
+            rule_outputs: np.ndarray = np.empty(len(self.rules), dtype=int)
+            for i, rule in enumerate(self.rules):
+                variable: SugenoVariable = rule.conclusion.variable
+                if variable not in columns or rule.conclusion.term not in columns[variable]:
+                    raise Exception('Функция заключения правила не найдена в выходной переменной')
+                rule_columns[i] = columns[variable][rule.conclusion.term]
+                rule_outputs[i] = outputs[variable]
+            self.__rule_functions = (key, rule_columns, rule_outputs)
+        return self.__rule_functions[1], self.__rule_functions[2]
+
+    def combine_result_batch(self, rw: np.ndarray, fr: np.ndarray) -> np.ndarray:
+        """
+        Объединяем результаты функций и правил для матрицы образцов
+        :param rw: матрица степеней срабатывания (правила x образцы)
+        :param fr: матрица значений функций (образцы x функции), результат evaluate_functions_batch,
+            или вектор значений функций, общий для всех образцов, результат function_constants
+        :return: матрица значений выходных переменных (образцы x выходные переменные)
+        """
+        rule_columns, rule_outputs = self.rule_functions()
+        # Принадлежность правила выходной переменной
+        groups: np.ndarray = np.zeros((len(self.rules), len(self.out)))
+        groups[np.arange(len(self.rules)), rule_outputs] = 1.
+        weights: np.ndarray = rw.T
+        if fr.ndim == 1:
+            # Значения заключений одинаковы для всех образцов: одно матричное произведение
+            numerator: np.ndarray = weights @ (fr[rule_columns, np.newaxis] * groups)
+        else:
+            numerator: np.ndarray = (weights * fr[:, rule_columns]) @ groups
+        denominator: np.ndarray = weights @ groups
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(denominator == .0, .0, numerator / denominator)
 
     def combine_result(self,
                        rw: Dict[FuzzyRule, float],
@@ -76,10 +224,69 @@ class SugenoFuzzySystem(GenericFuzzySystem):
         return {out: .0 if denominator[out] == .0 else numerator[out] / denominator[out] for out in self.out}
 
     def calculate(self, input_values: Dict[FuzzyVariable, float]) -> Dict[SugenoVariable, float]:
+        """
+        Расчет нечеткой модели, результат берется из кэша, если он включен
+        :param input_values: входные значения
+        :return: значения выходных переменных
+        """
+        return self.cached_calculate(input_values, self.__calculate)
+
+    def calculate_vector(self, x: Sequence[float]) -> np.ndarray:
+        """
+        Расчет нечеткой модели для вектора входных значений
+        :param x: вектор входных значений в порядке self.inp
+        :return: вектор выходных значений в порядке self.out
+        """
+        result: Dict[SugenoVariable, float] = self.cached_calculate(
+            dict(zip(self.inp, self.validate_input_vector(x))), self.__calculate, False
+        )
+        return np.array([result[variable] for variable in self.out])
+
+    def session(self, input_values: Dict[FuzzyVariable, float], exact: bool = True) -> SugenoSession:
+        """
+        Сессия расчета, при обновлении пересчитываются только измененные переменные, зависящие от них правила и функции
+        :param input_values: начальные значения всех входных переменных
+        :param exact: результат совпадает с calculate без кэша, False - суммы обновляются приращениями
+        :return: сессия
+        """
+        return SugenoSession(self, input_values, exact)
+
+    def __calculate(self, input_values: Dict[FuzzyVariable, float]) -> Dict[SugenoVariable, float]:
         if len(self.rules) == 0:
             raise Exception('Должно быть как минимум одно правило')
-        fi: Dict[FuzzyVariable, Dict[Term, float]] = self.fuzzify(input_values)     # Шаг фаззификации
-        rw: Dict[FuzzyRule, float] = self.evaluate_conditions(fi)                   # Агрегация подусловий
-        fr: Dict[SugenoVariable, Dict[SugenoFunction, float]] = self.evaluate_functions(input_values)
+        fi: Dict[FuzzyVariable, Dict[Term, float]] = self.fuzzify(input_values, False)  # Шаг фаззификации
+        rw: Dict[FuzzyRule, float] = self.evaluate_active_conditions(fi)            # Агрегация подусловий
+        # Вычисляются только функции сработавших правил
+        fr: Dict[SugenoVariable, Dict[SugenoFunction, float]] = self.evaluate_functions(input_values, True)
         result: Dict[SugenoVariable, float] = self.combine_result(rw, fr)
         return result
+
+    def calculate_batch(self, x: np.ndarray, memory: int = 2 ** 26) -> np.ndarray:
+        """
+        Расчет нечеткой модели для матрицы входных значений.
+        Образцы обрабатываются порциями, чтобы промежуточные массивы не превышали memory
+        :param x: матрица входных значений (образцы x входные переменные) в порядке self.inp
+        :param memory: ограничение памяти на промежуточные массивы одной порции, байт
+        :return: матрица выходных значений (образцы x выходные переменные) в порядке self.out
+        """
+        if len(self.rules) == 0:
+            raise Exception('Должно быть как минимум одно правило')
+        x = self.validate_input_array(x)
+        result: np.ndarray = np.empty((x.shape[0], len(self.out)))
+        functions: int = sum(len(variable.functions) for variable in self.out)
+        width: int = max(self.compile_rules().size, 2 * len(self.rules), functions)
+        chunk: int = max(1, memory // (8 * width))
+        constants: [np.ndarray, None] = self.function_constants()
+        rule_columns, _ = self.rule_functions()
+        for start in range(0, x.shape[0], chunk):
+            part: np.ndarray = x[start:start + chunk]
+            rw: np.ndarray = self.evaluate_conditions_batch(self.fuzzify_batch(part))
+            if constants is not None:
+                fr: np.ndarray = constants
+            else:
+                # Вычисляются только функции правил, сработавших хотя бы на одном образце порции
+                needed: np.ndarray = np.zeros(functions, dtype=bool)
+                needed[rule_columns[rw.any(axis=1)]] = True
+                fr: np.ndarray = self.evaluate_functions_batch(part, needed)
+            result[start:start + chunk] = self.combine_result_batch(rw, fr)
+        return result
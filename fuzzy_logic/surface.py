@@ -0,0 +1,160 @@
+"""
+Luferov Victor <lyferov@yandex.ru>
+
+Control surface of fuzzy system
+"""
+
+from itertools import product
+from typing import List, Tuple, Sequence
+import numpy as np
+from .generic_fs import GenericFuzzySystem
+
+
+class ControlSurface:
+    """
+    Outputs of fuzzy system tabulated on uniform grid over the ranges of input variables.
+    Values between the nodes are found by multilinear interpolation.
+    """
+
+    def __init__(self, lower: Sequence[float], upper: Sequence[float], values: np.ndarray):
+        """
+        :param lower: minimum values of inputs
+        :param upper: maximum values of inputs
+        :param values: outputs in the nodes (nodes of input 1 x ... x nodes of input n x outputs)
+        """
+        self.lower: np.ndarray = np.asarray(lower, dtype=float)
+        self.upper: np.ndarray = np.asarray(upper, dtype=float)
+        self.values: np.ndarray = np.asarray(values, dtype=float)
+        if self.values.ndim != len(self.lower) + 1 or len(self.lower) != len(self.upper):
+            raise ValueError(f'Values of shape {self.values.shape} do not match {len(self.lower)} inputs')
+        if any(n < 2 for n in self.shape):
+            raise ValueError(f'Grid {self.shape} must have at least two nodes for every input')
+        if not np.all(self.lower < self.upper):
+            raise ValueError('Minimum values must be less than maximum values')
+        self.max_error: float = np.nan
+        self.mean_error: float = np.nan
+        # Для скалярного пути: шаги в плоском списке значений и смещения углов ячейки
+        self.__flat: List[List[float]] = self.values.reshape(-1, self.values.shape[-1]).tolist()
+        strides: List[int] = [int(np.prod(self.shape[i + 1:])) for i in range(len(self.shape))]
+        self.__strides: List[int] = strides
+        self.__corners: List[Tuple[int, Tuple[int, ...]]] = [
+            (sum(s for s, bit in zip(strides, bits) if bit), bits) for bits in product((0, 1), repeat=len(strides))
+        ]
+        self.__scale: List[Tuple[float, float, int]] = [
+            (lo, (n - 1) / (hi - lo), n - 2) for lo, hi, n in zip(self.lower.tolist(), self.upper.tolist(), self.shape)
+        ]
+
+    @classmethod
+    def build(cls,
+              system: GenericFuzzySystem,
+              resolution: [int, Sequence[int]] = 33,
+              validation: int = 1000,
+              seed: [int, None] = None) -> 'ControlSurface':
+        """
+        Tabulate system with calculate_batch
+        :param system: Mamdani or Sugeno fuzzy system
+        :param resolution: number of nodes for all inputs or for every input
+        :param validation: number of random points to measure interpolation error, max_error and mean_error
+        :param seed: seed of random points
+        :return: control surface
+        """
+        n: int = len(system.inp)
+        shape: Tuple[int, ...] = tuple([resolution] * n if isinstance(resolution, int) else resolution)
+        lower, upper = system.input_bounds()
+        axes: List[np.ndarray] = [np.linspace(lo, hi, k) for lo, hi, k in zip(lower, upper, shape)]
+        nodes: np.ndarray = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, n)
+        surface: ControlSurface = cls(lower, upper, system.calculate_batch(nodes).reshape(shape + (-1,)))
+        if validation > 0:
+            points: np.ndarray = np.random.default_rng(seed).uniform(lower, upper, (validation, n))
+            error: np.ndarray = np.abs(surface.interpolate(points) - system.calculate_batch(points))
+            surface.max_error = float(np.max(error))
+            surface.mean_error = float(np.mean(error))
+        return surface
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        """
+        :return: number of nodes for every input
+        """
+        return self.values.shape[:-1]
+
+    @property
+    def axes(self) -> List[np.ndarray]:
+        """
+        :return: nodes of every input
+        """
+        return [np.linspace(lo, hi, k) for lo, hi, k in zip(self.lower, self.upper, self.shape)]
+
+    def interpolate(self, x: np.ndarray) -> np.ndarray:
+        """
+        Multilinear interpolation
+        :param x: vector of inputs or matrix (samples x inputs)
+        :return: vector of outputs or matrix (samples x outputs)
+        """
+        x = np.asarray(x, dtype=float)
+        if x.ndim == 1:
+            return np.array(self.value(x.tolist()))
+        if x.ndim != 2 or x.shape[1] != len(self.lower):
+            raise Exception('Количество входных значений не верно')
+        if not np.all((self.lower <= x) & (x <= self.upper)):
+            raise Exception('Значние переменной выходит за диапазон')
+        n: np.ndarray = np.array(self.shape)
+        u: np.ndarray = (x - self.lower) * ((n - 1) / (self.upper - self.lower))
+        cell: np.ndarray = np.minimum(u.astype(int), n - 2)
+        t: np.ndarray = u - cell
+        result: np.ndarray = np.zeros((x.shape[0], self.values.shape[-1]))
+        for bits in product((0, 1), repeat=len(n)):
+            weight: np.ndarray = np.prod(np.where(bits, t, 1 - t), axis=1)
+            result += weight[:, np.newaxis] * self.values[tuple((cell + bits).T)]
+        return result
+
+    def value(self, x: Sequence[float]) -> List[float]:
+        """
+        Multilinear interpolation in one point without numpy overhead
+        :param x: inputs
+        :return: outputs
+        """
+        if len(x) != len(self.__scale):
+            raise Exception('Количество входных значений не верно')
+        base: int = 0
+        t: List[float] = []
+        for value, (lo, scale, last), stride, hi in zip(x, self.__scale, self.__strides, self.upper.tolist()):
+            if not lo <= value <= hi:
+                raise Exception('Значние переменной выходит за диапазон')
+            u: float = (value - lo) * scale
+            cell: int = min(int(u), last)
+            base += cell * stride
+            t.append(u - cell)
+        result: List[float] = [0.] * len(self.__flat[0])
+        for offset, bits in self.__corners:
+            weight: float = 1.
+            for bit, ti in zip(bits, t):
+                weight *= ti if bit else 1 - ti
+            if weight != 0:
+                for j, v in enumerate(self.__flat[base + offset]):
+                    result[j] += weight * v
+        return result
+
+    def save(self, path: str):
+        """
+        Save surface to .npy file as one vector: number of inputs, number of outputs, shape, lower, upper, values
+        :param path: file name
+        """
+        n: int = len(self.lower)
+        np.save(path, np.concatenate([
+            [n, self.values.shape[-1]], self.shape, self.lower, self.upper, self.values.ravel()
+        ]).astype(float))
+
+    @classmethod
+    def load(cls, path: str) -> 'ControlSurface':
+        """
+        Load surface saved by save
+        :param path: file name
+        :return: control surface
+        """
+        data: np.ndarray = np.load(path)
+        n, outputs = int(data[0]), int(data[1])
+        shape: Tuple[int, ...] = tuple(int(k) for k in data[2:2 + n])
+        lower: np.ndarray = data[2 + n:2 + 2 * n]
+        upper: np.ndarray = data[2 + 2 * n:2 + 3 * n]
+        return cls(lower, upper, data[2 + 3 * n:].reshape(shape + (outputs,)))
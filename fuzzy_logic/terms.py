@@ -4,14 +4,21 @@ Luferov Victor <lyferov@yandex.ru>
 Fuzzy Terms
 """
 
-from .mf import MembershipFunction
+from .mf import MembershipFunction, touch_parameters
 
 
 class Term:
     """
     Fuzzy term
     """
+    __slots__ = ('name', 'mf')
 
     def __init__(self, name: str, mf: MembershipFunction):
         self.name: str = name
         self.mf: MembershipFunction = mf
+
+    def __setattr__(self, name: str, value):
+        if name == 'mf' and hasattr(self, name):
+            # Замена функции принадлежности меняет параметры термов
+            touch_parameters()
+        super().__setattr__(name, value)
@@ -0,0 +1,262 @@
+"""
+Luferov Victor <lyferov@yandex.ru>
+
+List with modification tracking
+"""
+
+import operator
+from itertools import count
+from typing import Callable, List, Tuple
+
+_versions = count(1)
+
+
+def next_version() -> int:
+    """
+    :return: new version, unique among all versions of tracked data
+    """
+    return next(_versions)
+
+
+class TrackedList(list):
+    """
+    List that remembers the version of its last modification.
+    Versions are unique among all tracked lists, so data cached from a list may be keyed by its version.
+    """
+    __slots__ = ('version',)
+
+    def __init__(self, iterable=()):
+        super().__init__(iterable)
+        self.version: int = next_version()
+
+    def touch(self):
+        """
+        Mark list as modified, e.g. after changing its items in place
+        """
+        self.version = next_version()
+
+    def append(self, item):
+        super().append(item)
+        self.touch()
+
+    def extend(self, iterable):
+        super().extend(iterable)
+        self.touch()
+
+    def insert(self, index, item):
+        super().insert(index, item)
+        self.touch()
+
+    def remove(self, item):
+        super().remove(item)
+        self.touch()
+
+    def pop(self, index=-1):
+        item = super().pop(index)
+        self.touch()
+        return item
+
+    def clear(self):
+        super().clear()
+        self.touch()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self.touch()
+
+    def reverse(self):
+        super().reverse()
+        self.touch()
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self.touch()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self.touch()
+
+    def __iadd__(self, other):
+        result = super().__iadd__(other)
+        self.touch()
+        return result
+
+    def __imul__(self, other):
+        result = super().__imul__(other)
+        self.touch()
+        return result
+
+
+_missing = object()  # Item of LazyList that is not created yet
+
+
+class LazyList(TrackedList):
+    """
+    Tracked list whose items are created by factory on first access.
+    Items are kept once created, modification of the list creates all items first.
+    """
+    __slots__ = ('__factory',)
+
+    def __init__(self, size: int, factory: Callable[[int], object]):
+        """
+        :param size: number of items
+        :param factory: function of index of item creating the item
+        """
+        super().__init__([_missing] * size)
+        self.__factory: [Callable[[int], object], None] = factory
+
+    def __item(self, i: int):
+        item = list.__getitem__(self, i)
+        if item is _missing:
+            item = self.__factory(i)
+            list.__setitem__(self, i, item)
+        return item
+
+    def created(self) -> List[Tuple[int, object]]:
+        """
+        :return: indices and items created so far
+        """
+        return [(i, item) for i, item in enumerate(list.__iter__(self)) if item is not _missing]
+
+    def create_all(self):
+        """
+        Create all items, after that the list behaves as TrackedList
+        """
+        if self.__factory is not None:
+            for i in range(len(self)):
+                self.__item(i)
+            self.__factory = None
+
+    def __getitem__(self, index):
+        if self.__factory is None:
+            return super().__getitem__(index)
+        if isinstance(index, slice):
+            return [self.__item(i) for i in range(*index.indices(len(self)))]
+        i: int = operator.index(index)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('list index out of range')
+        return self.__item(i)
+
+    def __iter__(self):
+        if self.__factory is None:
+            yield from super().__iter__()
+            return
+        i: int = 0
+        while i < len(self):
+            yield self.__item(i)
+            i += 1
+
+    def __reversed__(self):
+        for i in range(len(self) - 1, -1, -1):
+            yield self[i]
+
+    def __contains__(self, item) -> bool:
+        self.create_all()
+        return super().__contains__(item)
+
+    def __eq__(self, other) -> bool:
+        self.create_all()
+        return super().__eq__(other)
+
+    def __ne__(self, other) -> bool:
+        self.create_all()
+        return super().__ne__(other)
+
+    def __add__(self, other) -> list:
+        self.create_all()
+        return super().__add__(other)
+
+    def __repr__(self) -> str:
+        self.create_all()
+        return super().__repr__()
+
+    def index(self, item, *args) -> int:
+        self.create_all()
+        return super().index(item, *args)
+
+    def count(self, item) -> int:
+        self.create_all()
+        return super().count(item)
+
+    def copy(self) -> list:
+        self.create_all()
+        return super().copy()
+
+    def append(self, item):
+        self.create_all()
+        super().append(item)
+
+    def extend(self, iterable):
+        self.create_all()
+        super().extend(iterable)
+
+    def insert(self, index, item):
+        self.create_all()
+        super().insert(index, item)
+
+    def remove(self, item):
+        self.create_all()
+        super().remove(item)
+
+    def pop(self, index=-1):
+        self.create_all()
+        return super().pop(index)
+
+    def sort(self, *args, **kwargs):
+        self.create_all()
+        super().sort(*args, **kwargs)
+
+    def reverse(self):
+        self.create_all()
+        super().reverse()
+
+    def __setitem__(self, index, value):
+        self.create_all()
+        super().__setitem__(index, value)
+
+    def __delitem__(self, index):
+        self.create_all()
+        super().__delitem__(index)
+
+    def __iadd__(self, other):
+        self.create_all()
+        return super().__iadd__(other)
+
+    def __imul__(self, other):
+        self.create_all()
+        return super().__imul__(other)
+
+
+class NameIndex:
+    """
+    Index of items of tracked list by their name attribute.
+    It is rebuilt when the list is modified or a found item has been renamed; as with linear search,
+    the first item with the name wins.
+    """
+    __slots__ = ('__version', '__items')
+
+    def __init__(self):
+        self.__version: [int, None] = None
+        self.__items: dict = {}
+
+    def __rebuild(self, items: TrackedList):
+        self.__items = {item.name: item for item in reversed(items)}
+        self.__version = items.version
+
+    def find(self, items: TrackedList, name: str):
+        """
+        Find item by name
+        :param items: indexed list
+        :param name: name of item
+        :return: item or None
+        """
+        if self.__version != items.version:
+            self.__rebuild(items)
+        item = self.__items.get(name)
+        if item is None or item.name != name:
+            # Names may be changed in place
+            self.__rebuild(items)
+            item = self.__items.get(name)
+        return item
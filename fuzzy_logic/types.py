@@ -21,8 +21,12 @@ class AndMethod(Enum):
     """
     Method and
     """
-    MIN = 1     # min(a, b)
-    PROD = 2    # a * b
+    MIN = 1             # min(a, b)
+    PROD = 2            # a * b
+    LUKASIEWICZ = 3     # max(0, a + b - 1)
+    HAMACHER = 4        # a * b / (a + b - a * b)
+    EINSTEIN = 5        # a * b / (2 - (a + b - a * b))
+    DRASTIC = 6         # b if a == 1, a if b == 1, иначе 0
 
 
 class ImplicationMethod(Enum):
@@ -31,8 +35,12 @@ class ImplicationMethod(Enum):
 
 
 class OrMethod(Enum):
-    MAX = 1     # max(a, b)
-    PROB = 2    # a + b - a * b
+    MAX = 1             # max(a, b)
+    PROB = 2            # a + b - a * b
+    BOUNDED_SUM = 3     # min(1, a + b), т-конорма Лукасевича
+    HAMACHER = 4        # (a + b - 2 * a * b) / (1 - a * b)
+    EINSTEIN = 5        # (a + b) / (1 + a * b)
+    DRASTIC = 6         # b if a == 0, a if b == 0, иначе 1
 
 
 class AggregationMethod(Enum):
@@ -47,6 +55,19 @@ class DefuzzificationMethod(Enum):
     CENTROID = 1
     BISECTOR = 2
     AVERAGE_MAXIMUM = 3
+    SMALLEST_MAXIMUM = 4
+    LARGEST_MAXIMUM = 5
+
+
+class IntegrationMethod(Enum):
+    """
+    Method of integration for centroid defuzzification
+    """
+    RECTANGLE = 1   # Сумма левых прямоугольников по равномерной сетке, результат округляется до 8 знаков
+    EXACT = 2       # Точное вычисление для кусочно-линейных термов
+    TRAPEZOID = 3   # Формула трапеций по равномерной сетке, включающей границы
+    SIMPSON = 4     # Формула Симпсона по равномерной сетке, включающей границы
+    ADAPTIVE = 5    # Адаптивная формула Симпсона с заданной точностью
 
 
 class OperatorType(Enum):
@@ -75,3 +96,15 @@ class DefazzificationMethod(Enum):
     CENTROID = 1
     BISECTOR = 2
     AVERAGE_MAXIMUM = 3
+    SMALLEST_MAXIMUM = 4
+    LARGEST_MAXIMUM = 5
+
+
+class ConsequentSolver(Enum):
+    """
+    Least squares method for consequent parameters of ANFIS
+    """
+    PINV = 1        # Псевдообратная матрица всей матрицы коэффициентов
+    LSTSQ = 2       # Метод наименьших квадратов np.linalg.lstsq
+    CHOLESKY = 3    # Нормальные уравнения с гребневой регуляризацией, разложение Холецкого
+    CHUNKED = 4     # Нормальные уравнения, накопленные по порциям образцов, матрица коэффициентов не хранится
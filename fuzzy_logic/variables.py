@@ -7,11 +7,20 @@ Fuzzy Variable
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Dict
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import List, Dict, Tuple
+import numpy as np
 from .terms import Term
+from .mf import MembershipFunction, parameters_version, TabulatedMF, MembershipFunctionBank, TriangularBank, \
+    TrapezoidBank, NormalBank
+from .tracked_list import TrackedList, LazyList, NameIndex
 
 
 class FuzzyVariable:
+    __slots__ = ('name', 'min_value', 'max_value', '__terms', '__index', '__bank', '__bank_version', '__bank_key',
+                 '__names')
 
     def __init__(self, name: str, min_value: float = 0.0, max_value: float = 1.0, *terms: Term):
         if min_value >= max_value:
@@ -20,6 +29,161 @@ class FuzzyVariable:
         self.min_value: float = min_value
         self.max_value: float = max_value
         self.terms: List[Term] = list(terms)
+        self.__index: [Tuple, None] = None
+        self.__bank: [MembershipFunctionBank, None] = None
+        self.__bank_version: int = 0
+        self.__bank_key: Tuple[int, int] = (0, 0)
+        self.__names: NameIndex = NameIndex()
+
+    @classmethod
+    def from_bank(cls,
+                  name: str,
+                  min_value: float,
+                  max_value: float,
+                  bank: MembershipFunctionBank,
+                  names: [List[str], None] = None) -> 'FuzzyVariable':
+        """
+        Create variable from bank of mf, terms are views of the rows of the bank.
+        Terms are created on first access, so until then the variable keeps only the bank and the names.
+        Modification of the list of terms, search by name and parsing of rules create all terms
+        :param name: name of variable
+        :param min_value: minimum value
+        :param max_value: maximum value
+        :param bank: bank of mf
+        :param names: names of terms, mf1, mf2, ... by default
+        :return: fuzzy variable
+        """
+        if names is not None and len(names) != len(bank):
+            raise ValueError(f'Number of names {len(names)} != number of terms {len(bank)}')
+
+        def term(i: int) -> Term:
+            return Term(f'mf{i + 1}' if names is None else names[i], bank.mf(i))
+
+        variable: FuzzyVariable = cls(name, min_value, max_value)
+        variable.__terms = LazyList(len(bank), term)
+        variable.__bank = bank
+        variable.__bank_version = variable.__terms.version
+        return variable
+
+    @classmethod
+    def from_triangular(cls, name: str, min_value: float, max_value: float, params: np.ndarray,
+                        names: [List[str], None] = None) -> 'FuzzyVariable':
+        """
+        Create variable from array (terms x 3) of parameters of triangular mf
+        """
+        return cls.from_bank(name, min_value, max_value, TriangularBank(params), names)
+
+    @classmethod
+    def from_trapezoid(cls, name: str, min_value: float, max_value: float, params: np.ndarray,
+                       names: [List[str], None] = None) -> 'FuzzyVariable':
+        """
+        Create variable from array (terms x 4) of parameters of trapezoid mf
+        """
+        return cls.from_bank(name, min_value, max_value, TrapezoidBank(params), names)
+
+    @classmethod
+    def from_normal(cls, name: str, min_value: float, max_value: float, params: np.ndarray,
+                    names: [List[str], None] = None, truncation: float = np.inf) -> 'FuzzyVariable':
+        """
+        Create variable from array (terms x 2) of parameters of normal mf: b, sigma
+        """
+        return cls.from_bank(name, min_value, max_value, NormalBank(params, truncation), names)
+
+    @property
+    def bank(self) -> [MembershipFunctionBank, None]:
+        """
+        :return: bank of mf of terms or None if variable was not created from bank or terms were changed
+        """
+        if self.__bank is not None:
+            # Replacing mf of a term changes parameters_version, so created terms are checked only after changes
+            key: Tuple[int, int] = (self.__terms.version, parameters_version())
+            if key != self.__bank_key:
+                if self.__bank_version != self.__terms.version or not all(
+                        getattr(term.mf, 'bank', None) is self.__bank and term.mf.index == i
+                        for i, term in self.__terms.created()):
+                    self.__bank = None
+                self.__bank_key = key
+        return self.__bank
+
+    @property
+    def terms(self) -> List[Term]:
+        return self.__terms
+
+    @terms.setter
+    def terms(self, value: List[Term]):
+        self.__terms: TrackedList = TrackedList(value)
+
+    def __term_index(self) -> Tuple:
+        """
+        Index of term supports: bounded supports sorted by left bound and terms with unbounded support
+        It is rebuilt when terms or parameters of mf change, see parameters_version
+        :return: version, left bounds, right bounds, positions of terms, max width, positions of unbounded terms,
+            supports of all terms in their order
+        """
+        version: Tuple[int, int] = (self.__terms.version, parameters_version())
+        if self.__index is None or self.__index[0] != version:
+            bank: [MembershipFunctionBank, None] = self.bank
+            if bank is not None:
+                lefts, rights = bank.supports
+            else:
+                lefts, rights = np.array([term.mf.support for term in self.__terms], dtype=float).reshape(-1, 2).T
+            finite: np.ndarray = np.isfinite(lefts) & np.isfinite(rights)
+            bounded: np.ndarray = np.nonzero(finite)[0]
+            bounded = bounded[np.argsort(lefts[bounded], kind='stable')]
+            # Compact arrays for bisect instead of lists of Python numbers
+            self.__index = (
+                version,
+                array('d', lefts[bounded].tobytes()),
+                array('d', rights[bounded].tobytes()),
+                array('q', bounded.astype(np.int64).tobytes()),
+                float(np.max(rights[bounded] - lefts[bounded], initial=0.0)),
+                np.nonzero(~finite)[0].tolist(),
+                (np.asarray(lefts), np.asarray(rights))
+            )
+        return self.__index
+
+    def active_terms(self, x: float) -> List[Term]:
+        """
+        Terms whose support contains x, in O(log T + active) for terms of similar width
+        :param x: value of variable
+        :return: list of terms
+        """
+        _, lefts, rights, positions, width, unbounded, _ = self.__term_index()
+        start: int = bisect_left(lefts, x - width)
+        stop: int = bisect_right(lefts, x)
+        active: List[int] = [positions[k] for k in range(start, stop) if rights[k] >= x]
+        if len(unbounded) > 0:
+            active = sorted(active + unbounded)
+        return [self.__terms[i] for i in active]
+
+    def fuzzify(self, x: float) -> Dict[Term, float]:
+        """
+        Sparse fuzzification: only terms whose support contains x are evaluated
+        :param x: value of variable
+        :return: values of terms, missing terms are equal to zero
+        """
+        result: Dict[Term, float] = defaultdict(float)
+        for term in self.active_terms(x):
+            result[term] = term.mf.get_value(x)
+        return result
+
+    def fuzzify_values(self, x: np.ndarray) -> np.ndarray:
+        """
+        Dense fuzzification of array of points, values out of supports of terms are zero as in fuzzify
+        :param x: array of values of variable
+        :return: array (terms x *x.shape) of values of terms
+        """
+        x = np.asarray(x, dtype=float)
+        bank: [MembershipFunctionBank, None] = self.bank
+        if bank is not None:
+            result: np.ndarray = bank.get_values(x)
+        else:
+            result: np.ndarray = np.empty((len(self.__terms),) + x.shape)
+            for i, term in enumerate(self.__terms):
+                result[i] = term.mf.get_values(x)
+        lefts, rights = self.__term_index()[-1]
+        shape: Tuple[int, ...] = (-1,) + (1,) * x.ndim
+        return np.where((lefts.reshape(shape) <= x) & (x <= rights.reshape(shape)), result, 0.0)
 
     def term_by_name(self, name: str) -> Term or None:
         """
@@ -27,9 +191,20 @@ class FuzzyVariable:
         :param name: name of term
         :return: term
         """
-        for term in self.terms:
-            if term.name == name:
-                return term
+        return self.__names.find(self.__terms, name)
+
+    def tabulate(self, resolution: int = 1001) -> float:
+        """
+        Replace mf of every term with its lookup table on [min_value, max_value]
+        :param resolution: number of points in table
+        :return: max approximation error among terms
+        """
+        for term in self.__terms:
+            if not isinstance(term.mf, TabulatedMF):
+                term.mf = TabulatedMF(term.mf, self.min_value, self.max_value, resolution)
+                self.__bank = None
+        self.__terms.touch()
+        return max((term.mf.max_error for term in self.__terms), default=0.0)
 
     @property
     def values(self):
@@ -49,6 +224,23 @@ class SugenoFunction(ABC):
     def evaluate(self, inputs: Dict[FuzzyVariable, float]) -> float:
         ...
 
+    def evaluate_values(self, inp: List[FuzzyVariable], x: np.ndarray) -> np.ndarray:
+        """
+        Calculate function for every row of matrix
+        :param inp: input variables, columns of x
+        :param x: matrix (samples x inputs) of values
+        :return: vector of results
+        """
+        return np.fromiter((self.evaluate(dict(zip(inp, row))) for row in x.tolist()), dtype=float, count=len(x))
+
+    @property
+    def parameters(self):
+        """
+        Value of parameters, data cached from the function is keyed by it.
+        Unknown functions are keyed by themselves
+        """
+        return self
+
 
 class LinearSugenoFunction(SugenoFunction):
 
@@ -67,7 +259,127 @@ class LinearSugenoFunction(SugenoFunction):
         :param inputs: Values
         :return: result of calculation
         """
-        return self.const + sum([self.coefficients[variable] * value for variable, value in inputs.items()])
+        return self.const + sum([self.coefficients.get(variable, .0) * value for variable, value in inputs.items()])
+
+    def evaluate_values(self, inp: List[FuzzyVariable], x: np.ndarray) -> np.ndarray:
+        """
+        Calculate linear function for every row of matrix
+        :param inp: input variables, columns of x
+        :param x: matrix (samples x inputs) of values
+        :return: vector of results
+        """
+        return self.const + x @ np.array([self.coefficients.get(variable, .0) for variable in inp], dtype=float)
+
+    @property
+    def parameters(self) -> tuple:
+        return self.const, tuple(self.coefficients.items())
+
+
+class ConstantSugenoFunction(SugenoFunction):
+    """
+    Zero-order Sugeno function y = const
+    """
+
+    def __init__(self, name: str, const: float = .0):
+        self.__name: str = name
+        self.const: float = const
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    def evaluate(self, inputs: Dict[FuzzyVariable, float]) -> float:
+        """
+        :param inputs: Values, not used
+        :return: constant
+        """
+        return self.const
+
+    def evaluate_values(self, inp: List[FuzzyVariable], x: np.ndarray) -> np.ndarray:
+        """
+        :param inp: input variables, columns of x
+        :param x: matrix (samples x inputs) of values
+        :return: vector of constants
+        """
+        return np.full(len(x), self.const, dtype=float)
+
+    @property
+    def parameters(self) -> float:
+        return self.const
+
+
+class PolynomialSugenoFunction(SugenoFunction):
+    """
+    Polynomial Sugeno function y = const + sum of coefficient * product of variables of monomial,
+    e.g. {(x1,): 2, (x1, x1): 3, (x1, x2): 1} is 2 * x1 + 3 * x1 ** 2 + x1 * x2
+    """
+
+    def __init__(self, name: str, coefficients: Dict[Tuple[FuzzyVariable, ...], float], const: float = .0):
+        self.__name: str = name
+        self.coefficients: Dict[Tuple[FuzzyVariable, ...], float] = coefficients
+        self.const: float = const
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    def evaluate(self, inputs: Dict[FuzzyVariable, float]) -> float:
+        """
+        Calculate polynomial
+        :param inputs: Values
+        :return: result of calculation
+        """
+        result: float = self.const
+        for monomial, coefficient in self.coefficients.items():
+            for variable in monomial:
+                coefficient *= inputs[variable]
+            result += coefficient
+        return result
+
+    def evaluate_values(self, inp: List[FuzzyVariable], x: np.ndarray) -> np.ndarray:
+        """
+        Calculate polynomial for every row of matrix
+        :param inp: input variables, columns of x
+        :param x: matrix (samples x inputs) of values
+        :return: vector of results
+        """
+        columns: Dict[FuzzyVariable, int] = {variable: i for i, variable in reversed(list(enumerate(inp)))}
+        result: np.ndarray = np.full(len(x), self.const, dtype=float)
+        for monomial, coefficient in self.coefficients.items():
+            term: np.ndarray = np.full(len(x), coefficient, dtype=float)
+            for variable in monomial:
+                term *= x[:, columns[variable]]
+            result += term
+        return result
+
+    @property
+    def parameters(self) -> tuple:
+        return self.const, tuple(self.coefficients.items())
+
+    @classmethod
+    def quadratic(cls,
+                  name: str,
+                  inp: List[FuzzyVariable],
+                  linear: List[float],
+                  quadratic: List[List[float]],
+                  const: float = .0) -> 'PolynomialSugenoFunction':
+        """
+        Quadratic function y = const + sum linear[i] * x_i + sum quadratic[i][j] * x_i * x_j for i <= j
+        :param name: name of function
+        :param inp: input variables
+        :param linear: coefficients of variables
+        :param quadratic: upper triangle of coefficients of products, values below diagonal are ignored
+        :param const: constant
+        :return: function
+        """
+        coefficients: Dict[Tuple[FuzzyVariable, ...], float] = {
+            (variable,): float(c) for variable, c in zip(inp, linear) if c != 0
+        }
+        for i, row in enumerate(quadratic):
+            for j in range(i, len(row)):
+                if row[j] != 0:
+                    coefficients[(inp[i], inp[j])] = float(row[j])
+        return cls(name, coefficients, const)
 
 
 class SugenoVariable:
@@ -78,11 +390,64 @@ class SugenoVariable:
     def __init__(self, name: str, *functions: SugenoFunction):
         self.name: str = name
         self.functions: List[SugenoFunction] = list(functions)
+        self.__names: NameIndex = NameIndex()
+        self.__matrix: [Tuple[tuple, np.ndarray, np.ndarray], None] = None
+        self.__constants: [Tuple[tuple, np.ndarray], None] = None
+
+    @property
+    def functions(self) -> List[SugenoFunction]:
+        return self.__functions
+
+    @functions.setter
+    def functions(self, value: List[SugenoFunction]):
+        self.__functions: TrackedList = TrackedList(value)
 
     def function_by_name(self, name: str) -> SugenoFunction:
-        for function in self.functions:
-            if function.name == name:
-                return function
+        """
+        Find function by name
+        :param name: name of function
+        :return: function
+        """
+        return self.__names.find(self.__functions, name)
+
+    def coefficient_matrix(self, inp: List[FuzzyVariable]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Linear and constant functions packed into one matrix, rebuilt when the list of functions, their parameters
+        or inputs change. Missing coefficients are zero
+        :param inp: input variables, columns 1.. of matrix
+        :return: matrix (functions x (inputs + 1)) with constants in column 0 and mask of packed functions,
+            rows of other functions are zero
+        """
+        key: tuple = (self.__functions.version, tuple(inp), tuple(function.parameters for function in self.__functions))
+        if self.__matrix is None or self.__matrix[0] != key:
+            matrix: np.ndarray = np.zeros((len(self.__functions), len(inp) + 1))
+            linear: np.ndarray = np.zeros(len(self.__functions), dtype=bool)
+            for i, function in enumerate(self.__functions):
+                # Subclasses may override evaluate, so only the class itself is packed
+                if type(function) is LinearSugenoFunction:
+                    matrix[i, 0] = function.const
+                    matrix[i, 1:] = [function.coefficients.get(variable, .0) for variable in inp]
+                    linear[i] = True
+                elif type(function) is ConstantSugenoFunction:
+                    matrix[i, 0] = function.const
+                    linear[i] = True
+            self.__matrix = (key, matrix, linear)
+        return self.__matrix[1], self.__matrix[2]
+
+    @property
+    def constants(self) -> [np.ndarray, None]:
+        """
+        Values of functions when all of them are constant, such variables need no arithmetic at all.
+        Rebuilt when the list of functions or their parameters change
+        :return: vector of constants or None
+        """
+        key: tuple = (self.__functions.version, tuple(function.parameters for function in self.__functions))
+        if self.__constants is None or self.__constants[0] != key:
+            values: [np.ndarray, None] = None
+            if all(type(function) is ConstantSugenoFunction for function in self.__functions):
+                values = np.array([function.const for function in self.__functions], dtype=float)
+            self.__constants = (key, values)
+        return self.__constants[1]
 
     @property
     def values(self):
@@ -1 +1,6 @@
 from .mf_test import FuzzyVariablesTestCase
+from .mamdani_test import MamdaniFuzzySystemTestCase
+from .variables_test import FuzzyVariableTestCase
+from .sugeno_test import SugenoFuzzySystemTestCase
+from .surface_test import ControlSurfaceTestCase
+from .anfis_test import AnfisTestCase
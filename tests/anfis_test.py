@@ -0,0 +1,122 @@
+import unittest
+from unittest import mock
+import numpy as np
+from fuzzy_logic.anfis import Anfis
+from fuzzy_logic.types import ConsequentSolver
+from fuzzy_logic.variables import LinearSugenoFunction, ConstantSugenoFunction
+
+
+class AnfisTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        print(f'setUp: {self.__class__.__name__}\n')
+        self.x: np.ndarray = np.array([
+            [.1, .3, .5, .7, .9],
+            [.1, .2, .4, .6, .8]
+        ])
+        self.y: np.ndarray = np.array([.01, .06, .2, .42, .72])
+
+    def tearDown(self) -> None:
+        print(f'tearDown: {self.__class__.__name__}\n')
+
+    def test_generate(self):
+        anfis: Anfis = Anfis(self.x, self.y, .5)
+        anfis.generate()
+        self.assertEqual(len(anfis.rules), 5)
+        self.assertTrue(all(isinstance(sf, ConstantSugenoFunction) for sf in anfis.out[0].functions))
+
+    def test_train(self):
+        anfis: Anfis = Anfis(self.x, self.y, .5)
+        anfis.train()
+        self.assertEqual(len(anfis.errors_train), anfis.epochs)
+        self.assertLess(anfis.errors_train[-1], 1e-20)
+        self.assertTrue(all(isinstance(sf, LinearSugenoFunction) for sf in anfis.out[0].functions))
+        self.assertAlmostEqual(anfis.calculate([.2, .3]), 0.05749629308724648, 12)
+        for x1, x2, y in zip(*self.x, self.y):
+            self.assertAlmostEqual(anfis.calculate([x1, x2]), y, 6)
+
+    def test_premise_step(self):
+        rng: np.random.Generator = np.random.default_rng(3)
+        x: np.ndarray = rng.uniform(0, 1, (2, 100))
+        y: np.ndarray = x[0] * x[1] + np.sin(5 * x[0]) / 10
+        anfis: Anfis = Anfis(x, y, .5)
+        anfis.epochs = 1
+        anfis.train()
+        centers: list = [term.mf.b for fv in anfis.inp for term in fv.terms]
+        sigmas: list = [term.mf.sigma for fv in anfis.inp for term in fv.terms]
+        anfis: Anfis = Anfis(x, y, .5)
+        anfis.epochs = 10
+        anfis.nu = .5
+        anfis.train()
+        self.assertTrue(all(e1 >= e2 for e1, e2 in zip(anfis.errors_train, anfis.errors_train[1:])))
+        self.assertNotEqual(centers, [term.mf.b for fv in anfis.inp for term in fv.terms])
+        self.assertNotEqual(sigmas, [term.mf.sigma for fv in anfis.inp for term in fv.terms])
+
+    def test_solvers(self):
+        rng: np.random.Generator = np.random.default_rng(1)
+        x: np.ndarray = rng.uniform(0, 1, (2, 200))
+        y: np.ndarray = x[0] ** 2 + x[1] / 2
+        outputs: dict = {}
+        for solver, ridge, chunk_size in [(ConsequentSolver.PINV, 0, 4096), (ConsequentSolver.LSTSQ, 0, 4096),
+                                          (ConsequentSolver.CHOLESKY, 0, 4096), (ConsequentSolver.CHUNKED, 0, 64),
+                                          (ConsequentSolver.CHOLESKY, 1e-3, 4096),
+                                          (ConsequentSolver.CHUNKED, 1e-3, 64)]:
+            anfis: Anfis = Anfis(x, y, .5)
+            anfis.epochs = 3
+            anfis.solver, anfis.ridge, anfis.chunk_size = solver, ridge, chunk_size
+            anfis.train()
+            outputs[solver, ridge] = anfis.calculate([.2, .3])
+        expected: float = outputs[ConsequentSolver.PINV, 0]
+        for solver in [ConsequentSolver.LSTSQ, ConsequentSolver.CHOLESKY, ConsequentSolver.CHUNKED]:
+            self.assertAlmostEqual(outputs[solver, 0], expected, 8)
+        self.assertAlmostEqual(outputs[ConsequentSolver.CHUNKED, 1e-3], outputs[ConsequentSolver.CHOLESKY, 1e-3], 10)
+        self.assertNotAlmostEqual(outputs[ConsequentSolver.CHOLESKY, 1e-3], expected, 8)
+
+    def test_singular_normal_equations(self):
+        anfis: Anfis = Anfis(self.x, self.y, .5)
+        anfis.solver = ConsequentSolver.CHOLESKY
+        with self.assertRaises(Exception):
+            anfis.train()
+        anfis: Anfis = Anfis(self.x, self.y, .5)
+        anfis.solver = ConsequentSolver.CHOLESKY
+        anfis.ridge = 1e-9
+        anfis.train()
+        for x1, x2, y in zip(*self.x, self.y):
+            self.assertAlmostEqual(anfis.calculate([x1, x2]), y, 4)
+
+    def test_solver_options(self):
+        anfis: Anfis = Anfis(self.x, self.y, .5)
+        self.assertEqual(anfis.solver, ConsequentSolver.PINV)
+        with self.assertRaises(Exception):
+            anfis.solver = 'pinv'
+        with self.assertRaises(Exception):
+            anfis.ridge = -1
+        with self.assertRaises(Exception):
+            anfis.chunk_size = 0
+
+    def test_chunked(self):
+        rng: np.random.Generator = np.random.default_rng(1)
+        x: np.ndarray = rng.uniform(0, 1, (2, 200))
+        y: np.ndarray = x[0] ** 2 + x[1] / 2
+        anfises: list = []
+        for solver in (ConsequentSolver.CHOLESKY, ConsequentSolver.CHUNKED):
+            anfis: Anfis = Anfis(x, y, .5)
+            anfis.epochs = 3
+            anfis.solver, anfis.ridge, anfis.chunk_size = solver, 1e-3, 64
+            anfises.append(anfis)
+        anfises[0].train()
+        # Samples are processed only by chunks
+        with mock.patch.object(Anfis, 'fuzzify_batch', autospec=True, side_effect=Anfis.fuzzify_batch) as fuzzify, \
+                mock.patch.object(Anfis, '_Anfis__premise_gradient', autospec=True,
+                                  side_effect=getattr(Anfis, '_Anfis__premise_gradient')) as gradient:
+            anfises[1].train()
+        self.assertTrue(all(len(call.args[1]) <= 64 for call in fuzzify.call_args_list))
+        self.assertEqual(gradient.call_count, 3 * 4)
+        self.assertTrue(all(len(call.args[2]) <= 64 for call in gradient.call_args_list))
+        for expected, error in zip(anfises[0].errors_train, anfises[1].errors_train):
+            self.assertAlmostEqual(error, expected, 10)
+        self.assertAlmostEqual(anfises[1].calculate([.2, .3]), anfises[0].calculate([.2, .3]), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
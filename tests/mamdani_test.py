@@ -0,0 +1,283 @@
+import unittest
+from unittest import mock
+import numpy as np
+from fuzzy_logic.terms import Term
+from fuzzy_logic.variables import FuzzyVariable
+from fuzzy_logic.mamdani_fs import MamdaniFuzzySystem
+from fuzzy_logic.mf import TriangularMF, NormalMF, TrapezoidMF, CompositeMF, ConstantMF
+from fuzzy_logic.defuzzification import centroid_adaptive
+from fuzzy_logic.rules import FuzzyRule, Conditions, FuzzyCondition, SingleCondition
+from fuzzy_logic.rule_parser import RuleParser
+from fuzzy_logic.compiled_rules import and_kernel, or_kernel, register_and_kernel
+from fuzzy_logic.types import IntegrationMethod, AndMethod, OrMethod, OperatorType, HedgeType, \
+    ImplicationMethod, AggregationMethod, DefazzificationMethod, MfCompositionType
+
+
+class MamdaniFuzzySystemTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        print(f'setUp: {self.__class__.__name__}\n')
+        self.input1: FuzzyVariable = FuzzyVariable(
+            'input1', 0, 1,
+            Term('mf1', TriangularMF(0, 0, 0.5)),
+            Term('mf2', TriangularMF(0, 0.5, 1)),
+            Term('mf3', TriangularMF(0.5, 1, 1))
+        )
+        self.input2: FuzzyVariable = FuzzyVariable(
+            'input2', 0, 1,
+            Term('mf1', TriangularMF(0, 0, 0.5)),
+            Term('mf2', TriangularMF(0, 0.5, 1)),
+            Term('mf3', TriangularMF(0.5, 1, 1))
+        )
+        self.output: FuzzyVariable = FuzzyVariable(
+            'output', 0, 1,
+            Term('mf1', TriangularMF(0, 0, 0.5)),
+            Term('mf2', TriangularMF(0, 0.5, 1)),
+            Term('mf3', TriangularMF(0.5, 1, 1))
+        )
+
+    def tearDown(self) -> None:
+        print(f'tearDown: {self.__class__.__name__}\n')
+
+    def system(self, **kwargs) -> MamdaniFuzzySystem:
+        mf: MamdaniFuzzySystem = MamdaniFuzzySystem([self.input1, self.input2], [self.output], **kwargs)
+        mf.rules.append(mf.parse_rule('if (input1 is mf1) and (input2 is mf1) then (output is mf1)'))
+        mf.rules.append(mf.parse_rule('if (input1 is mf2) and (input2 is mf2) then (output is mf2)'))
+        mf.rules.append(mf.parse_rule('if (input1 is mf3) or (input2 is mf3) then (output is mf3)'))
+        return mf
+
+    def test_calculate(self):
+        result = self.system().calculate({self.input1: 0.45, self.input2: 0.45})
+        self.assertAlmostEqual(result[self.output], 0.49706884)
+
+    def test_exact_centroid(self):
+        mf: MamdaniFuzzySystem = self.system(it=IntegrationMethod.EXACT)
+        # Only the mf3 rule fires: centroid of triangle (0.5, 1, 1)
+        self.assertAlmostEqual(mf.calculate({self.input1: 1, self.input2: 1})[self.output], 5 / 6, 12)
+        sampled: MamdaniFuzzySystem = self.system()
+        for x1, x2 in [(.1, .2), (.45, .45), (.3, .9), (.7, .6)]:
+            inp = {self.input1: x1, self.input2: x2}
+            self.assertAlmostEqual(mf.calculate(inp)[self.output], sampled.calculate(inp)[self.output], 2)
+        # Non-linear terms fall back to sampling
+        self.output.terms[1].mf = NormalMF(.5, .2)
+        inp = {self.input1: .45, self.input2: .45}
+        self.assertEqual(mf.calculate(inp)[self.output], sampled.calculate(inp)[self.output])
+
+    def test_integration_methods(self):
+        exact: MamdaniFuzzySystem = self.system(it=IntegrationMethod.EXACT)
+        for x1, x2 in [(.1, .2), (.45, .45), (.3, .9), (.7, .6)]:
+            inp = {self.input1: x1, self.input2: x2}
+            expected = exact.calculate(inp)[self.output]
+            for it, resolution, places in [(IntegrationMethod.TRAPEZOID, 101, 3),
+                                           (IntegrationMethod.TRAPEZOID, 1001, 5),
+                                           (IntegrationMethod.SIMPSON, 1001, 5),
+                                           (IntegrationMethod.ADAPTIVE, 101, 8)]:
+                mf: MamdaniFuzzySystem = self.system(it=it, resolution=resolution, tolerance=1e-10)
+                self.assertAlmostEqual(mf.calculate(inp)[self.output], expected, places)
+        # Legacy rectangle sum keeps its result
+        self.assertEqual(self.system(resolution=101).calculate({self.input1: .45, self.input2: .45})[self.output],
+                         0.49706884)
+
+    def test_tabulate(self):
+        mf: MamdaniFuzzySystem = self.system()
+        mf.enable_cache()
+        inp = {self.input1: .3, self.input2: .4}
+        version: int = self.input1.terms.version
+        before: float = mf.calculate(inp)[self.output]
+        self.assertLess(self.input1.tabulate(3), 1e-12)
+        self.assertNotEqual(self.input1.terms.version, version)
+        self.assertGreater(self.output.tabulate(2), .1)
+        after: float = mf.calculate(inp)[self.output]
+        self.assertNotEqual(after, before)
+        mf.disable_cache()
+        self.assertEqual(after, mf.calculate(inp)[self.output])
+
+    def test_adaptive_narrow_sets(self):
+        # Narrow gaussian clipped at 0.8 by the only fired rule
+        self.output.terms[1].mf = NormalMF(.3, .001)
+        mf: MamdaniFuzzySystem = self.system(it=IntegrationMethod.ADAPTIVE)
+        mf.rules.pop(0)
+        self.assertAlmostEqual(mf.calculate({self.input1: .4, self.input2: .4})[self.output], .3, 8)
+        # Narrow gaussian far from the nodes of a wide range
+        self.output = FuzzyVariable('output', 0, 10, Term('mf1', TriangularMF(0, 0, 5)),
+                                    Term('mf2', NormalMF(3.3, .03)), Term('mf3', TriangularMF(5, 10, 10)))
+        mf = self.system(it=IntegrationMethod.ADAPTIVE)
+        mf.rules.pop(0)
+        self.assertAlmostEqual(mf.calculate({self.input1: .4, self.input2: .4})[self.output], 3.3, 8)
+        # Smooth and wide sets need far fewer points than the grid
+        for term in (NormalMF(.5, .05), TriangularMF(0, .4, 1)):
+            expected: float = centroid_adaptive(term, 0, 1, 1e-10)
+            with mock.patch.object(type(term), 'get_values', autospec=True, side_effect=type(term).get_values) as m:
+                self.assertAlmostEqual(centroid_adaptive(term, 0, 1, 1e-3), expected, 4)
+            self.assertLess(sum(np.size(call.args[1]) for call in m.call_args_list), 60)
+        # Too many evaluations fall back to the grid
+        narrow: CompositeMF = CompositeMF(MfCompositionType.MIN, ConstantMF(.8), NormalMF(.3, .001))
+        self.assertIsNone(centroid_adaptive(narrow, 0, 1, 1e-12, max_evaluations=100))
+
+    def test_defuzzification_methods(self):
+        # Trapezoid clipped by the rule strength 0.6 of mf2
+        self.output.terms[1].mf = TrapezoidMF(.2, .4, .6, .8)
+        inp = {self.input1: .4, self.input2: .3}
+        expected = {
+            DefazzificationMethod.BISECTOR: .5,
+            DefazzificationMethod.AVERAGE_MAXIMUM: .5,
+            DefazzificationMethod.SMALLEST_MAXIMUM: .32,
+            DefazzificationMethod.LARGEST_MAXIMUM: .68,
+        }
+        x = np.array([[.4, .3], [.1, .9], [.7, .6], [1, 1]])
+        for dm, value in expected.items():
+            mf: MamdaniFuzzySystem = self.system(am=AndMethod.MIN, dm=dm)
+            mf.rules.pop(0)
+            # Grid step is 0.01
+            self.assertAlmostEqual(mf.calculate(inp)[self.output], value, delta=.011)
+            batch = mf.calculate_batch(x)
+            for (x1, x2), result in zip(x, batch[:, 0]):
+                self.assertEqual(result, mf.calculate({self.input1: x1, self.input2: x2})[self.output])
+
+    def test_output_grids(self):
+        for im in ImplicationMethod:
+            for ag in AggregationMethod:
+                mf: MamdaniFuzzySystem = self.system(im=im, ag=ag)
+                for x1, x2 in [(.1, .2), (.45, .45), (.3, .9), (.7, .6), (1, 1)]:
+                    inp = {self.input1: x1, self.input2: x2}
+                    fi = mf.fuzzify(inp)
+                    # Same result as with composite membership functions
+                    self.assertEqual(mf.calculate(inp),
+                                     mf.defuzzify(mf.aggregate(mf.implicate(mf.evaluate_conditions(fi)))))
+        grids, rule_variables, rule_rows = mf.output_grids()
+        self.assertEqual(grids[0][3].shape, (3, 101))
+        self.assertEqual(rule_rows.tolist(), [0, 1, 2])
+        self.assertIs(grids, mf.output_grids()[0])
+        self.output.terms[0].mf = TriangularMF(0, .1, .2)
+        self.assertIsNot(grids, mf.output_grids()[0])
+        # Parameters changed in place
+        inp = {self.input1: .3, self.input2: .2}
+        before: float = mf.calculate(inp)[self.output]
+        self.output.terms[0].mf.x3 = .9
+        self.assertEqual(mf.calculate(inp)[self.output], self.system(im=im, ag=ag).calculate(inp)[self.output])
+        self.assertNotEqual(mf.calculate(inp)[self.output], before)
+
+    def test_compiled_rules(self):
+        mf: MamdaniFuzzySystem = self.system()
+        terms = [RuleParser.TermLexem(term) for term in self.input1.terms]
+        mf.rules.append(FuzzyRule(
+            Conditions([
+                Conditions([FuzzyCondition(self.input1, terms[0], hedge=HedgeType.VERY),
+                            FuzzyCondition(self.input1, terms[1], True, HedgeType.SLIGHTLY)], OperatorType.OR, True),
+                FuzzyCondition(self.input1, terms[2], hedge=HedgeType.EXTREMELY),
+                Conditions([FuzzyCondition(self.input1, terms[1], hedge=HedgeType.SOMEWHAT)])
+            ], OperatorType.AND, True),
+            SingleCondition(self.output, self.output.terms[0])
+        ))
+        for am in AndMethod:
+            for om in OrMethod:
+                mf.and_method, mf.or_method = am, om
+                for x1, x2 in [(.1, .2), (.45, .45), (.3, .9), (.7, .6), (1, 0)]:
+                    fi = mf.fuzzify({self.input1: x1, self.input2: x2})
+                    self.assertEqual(mf.evaluate_conditions(fi),
+                                     {rule: mf.evaluate_condition(rule.condition, fi) for rule in mf.rules})
+                    # Only the non-zero rules are returned, rules with OR and NOT are evaluated fully
+                    self.assertEqual(mf.evaluate_active_conditions(fi),
+                                     {rule: value for rule, value in mf.evaluate_conditions(fi).items() if value})
+        compiled = mf.compile_rules()
+        self.assertEqual(compiled.conjunctive.tolist(), [0, 1])
+        self.assertEqual(compiled.other.tolist(), [2, 3])
+        self.assertIs(compiled, mf.compile_rules())
+        mf.rules.pop()
+        self.assertIsNot(compiled, mf.compile_rules())
+        self.assertEqual(len(mf.evaluate_conditions(mf.fuzzify({self.input1: .5, self.input2: .5}))), 3)
+
+    def test_calculate_batch(self):
+        x = np.array([[.1, .2], [.45, .45], [.3, .9], [.7, .6], [0, 0], [1, 1]])
+        for im in ImplicationMethod:
+            for ag in AggregationMethod:
+                for it in IntegrationMethod:
+                    mf: MamdaniFuzzySystem = self.system(im=im, ag=ag, it=it)
+                    # Small memory limit splits samples into several chunks
+                    result = mf.calculate_batch(x, memory=1000)
+                    self.assertEqual(result.shape, (6, 1))
+                    for (x1, x2), value in zip(x, result[:, 0]):
+                        self.assertEqual(value, mf.calculate({self.input1: x1, self.input2: x2})[self.output])
+        with self.assertRaises(Exception):
+            self.system().calculate_batch(np.array([[.5, 1.5]]))
+
+    def test_cache(self):
+        mf: MamdaniFuzzySystem = self.system()
+        cache = mf.enable_cache({self.input1: .1}, max_size=2)
+        first = mf.calculate({self.input1: .41, self.input2: .45})
+        # Same cell of input1, exact input2: calculated at the grid point
+        self.assertEqual(first, mf.calculate({self.input1: .39, self.input2: .45}))
+        self.assertEqual(first, self.system().calculate({self.input1: .4, self.input2: .45}))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        mf.calculate({self.input1: .41, self.input2: .5})
+        mf.calculate({self.input1: .41, self.input2: .6})
+        self.assertEqual(cache.info().evictions, 1)
+        self.assertEqual(len(cache), 2)
+        # Changing methods or rules drops cached results
+        mf.implication_method = ImplicationMethod.PROD
+        self.assertEqual(mf.calculate({self.input1: .41, self.input2: .45}),
+                         self.system(im=ImplicationMethod.PROD).calculate({self.input1: .4, self.input2: .45}))
+        mf.rules.pop()
+        mf.calculate({self.input1: .41, self.input2: .45})
+        self.assertEqual(cache.info(), (1, 5, 1, 1, 2))
+        # Changing parameters of mf in place drops cached results
+        self.input1.terms[1].mf.x3 = .9
+        expected: MamdaniFuzzySystem = self.system(im=ImplicationMethod.PROD)
+        expected.rules.pop()
+        self.assertEqual(mf.calculate({self.input1: .41, self.input2: .45}),
+                         expected.calculate({self.input1: .4, self.input2: .45}))
+        self.assertEqual(cache.misses, 6)
+        with self.assertRaises(Exception):
+            mf.calculate({self.input1: 1.02, self.input2: .45})
+        mf.disable_cache()
+        self.assertIsNone(mf.cache)
+
+    def test_session(self):
+        for ag in AggregationMethod:
+            for it in IntegrationMethod:
+                mf: MamdaniFuzzySystem = self.system(ag=ag, it=it)
+                values = {self.input1: .1, self.input2: .2}
+                session = mf.session(values)
+                self.assertEqual(session.result, mf.calculate(values))
+                for x1, x2 in ((.45, None), (None, .45), (.7, .9), (1, None), (None, 1), (.5, .5)):
+                    changes = {variable: value for variable, value in ((self.input1, x1), (self.input2, x2))
+                               if value is not None}
+                    values.update(changes)
+                    self.assertEqual(session.update(changes), mf.calculate(values))
+        # Changing the system starts the session over
+        mf.rules.pop()
+        self.assertEqual(session.update({}), mf.calculate(values))
+        self.input2.terms[0].mf.x3 = .8
+        self.assertEqual(session.update({}), mf.calculate(values))
+        with self.assertRaises(Exception):
+            session.update({self.input1: 1.5})
+
+    def test_operator_kernels(self):
+        a, b = np.array([0, .5, 1, .3]), np.array([.4, .7, .6, 0])
+        expected = {
+            AndMethod.LUKASIEWICZ: [0, .2, .6, 0],
+            AndMethod.HAMACHER: [0, .35 / .85, .6, 0],
+            AndMethod.EINSTEIN: [0, .35 / 1.15, .6, 0],
+            AndMethod.DRASTIC: [0, 0, .6, 0],
+            OrMethod.BOUNDED_SUM: [.4, 1, 1, .3],
+            OrMethod.HAMACHER: [.4, .5 / .65, 1, .3],
+            OrMethod.EINSTEIN: [.4, 1.2 / 1.35, 1, .3],
+            OrMethod.DRASTIC: [.4, 1, 1, .3],
+        }
+        for method, values in expected.items():
+            kernel = and_kernel(method) if isinstance(method, AndMethod) else or_kernel(method)
+            np.testing.assert_allclose(kernel(a, b), values)
+        # User kernels: registered key or the kernel itself
+        register_and_kernel('square', lambda x, y: (x * y) ** 2)
+        for am in ('square', lambda x, y: (x * y) ** 2):
+            mf: MamdaniFuzzySystem = self.system(am=am)
+            fi = mf.fuzzify({self.input1: .4, self.input2: .45})
+            self.assertEqual(mf.evaluate_conditions(fi),
+                             {rule: mf.evaluate_condition(rule.condition, fi) for rule in mf.rules})
+            self.assertAlmostEqual(mf.evaluate_conditions(fi)[mf.rules[1]], (.8 * .9) ** 2)
+        with self.assertRaises(Exception):
+            self.system(am='unknown').compile_rules()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,7 @@
 import unittest
-from fuzzy_logic.mf import TriangularMF
+import numpy as np
+from fuzzy_logic.mf import TriangularMF, TrapezoidMF, NormalMF, CompositeMF, ConstantMF, PointsMF, TabulatedMF
+from fuzzy_logic.types import MfCompositionType
 
 
 class FuzzyVariablesTestCase(unittest.TestCase):
@@ -19,6 +21,70 @@ class FuzzyVariablesTestCase(unittest.TestCase):
         self.assertEqual(self.tmf.get_value(1), 0)
         self.assertEqual(self.tmf.get_value(0.75), 0.5)
 
+    def test_get_values(self):
+        x: np.ndarray = np.concatenate([np.linspace(-.5, 1.5, 201), [0, .2, .5, .8, 1]])
+        mfs = [
+            self.tmf,
+            TriangularMF(0, 0, .5),
+            TrapezoidMF(0, .2, .8, 1),
+            TrapezoidMF(.2, .2, .2, .2),
+            NormalMF(.5, .2),
+            CompositeMF(MfCompositionType.MAX, CompositeMF(MfCompositionType.MIN, ConstantMF(.5), self.tmf))
+        ]
+        for mf in mfs:
+            values: np.ndarray = mf.get_values(x)
+            self.assertEqual(values.shape, x.shape)
+            self.assertTrue(np.array_equal(values, [mf.get_value(v) for v in x]))
+
+    def test_composite_compile(self):
+        inner = CompositeMF(MfCompositionType.MAX,
+                            CompositeMF(MfCompositionType.MIN, ConstantMF(.3), self.tmf),
+                            CompositeMF(MfCompositionType.PROD, ConstantMF(.5), TrapezoidMF(.2, .4, .6, .8)))
+        composite = CompositeMF(MfCompositionType.MAX, inner, ConstantMF(.1), NormalMF(.9, .05), ConstantMF(.2))
+        self.assertEqual(len(composite.flatten()), 5)
+        x: np.ndarray = np.linspace(0, 1, 101)
+        self.assertTrue(np.array_equal(composite.compile()(x), [composite.get_value(v) for v in x]))
+        self.assertTrue(np.array_equal(composite.get_values(x), composite.compile()(x)))
+
+    def test_composite_mutation(self):
+        clipped = CompositeMF(MfCompositionType.MIN, ConstantMF(.8), self.tmf)
+        composite = CompositeMF(MfCompositionType.MAX, clipped, TrapezoidMF(.6, .7, .8, .9))
+        x: np.ndarray = np.linspace(0, 1, 101)
+        compiled = composite.compile()
+        self.assertTrue(np.array_equal(composite.get_values(x), compiled(x)))
+        self.tmf.x2 = .25
+        clipped.mfs[0].value = .6
+        composite.mfs[1].x4 = 1.
+        self.assertEqual(composite.get_values([.25])[0], composite.get_value(.25))
+        self.assertTrue(np.array_equal(composite.get_values(x), [composite.get_value(v) for v in x]))
+        self.assertFalse(np.array_equal(compiled(x), composite.get_values(x)))
+        composite.mfs = (clipped, NormalMF(.9, .05))
+        self.assertTrue(np.array_equal(composite.get_values(x), [composite.get_value(v) for v in x]))
+
+    def test_tabulated_value(self):
+        mf: NormalMF = NormalMF(.5, .1)
+        tabulated: TabulatedMF = TabulatedMF(mf, 0, 1, 501)
+        x: np.ndarray = np.linspace(0, 1, 1001)
+        error: float = np.max(np.abs(tabulated.get_values(x) - mf.get_values(x)))
+        self.assertLess(error, 1e-4)
+        self.assertLessEqual(error, tabulated.max_error)
+        self.assertTrue(np.array_equal(tabulated.get_values(x), [tabulated.get_value(v) for v in x]))
+        self.assertEqual(TabulatedMF(self.tmf, 0, 1, 3).max_error, 0)
+
+    def test_points_value(self):
+        pmf: PointsMF = PointsMF([(1, 0), (0, 0), (.5, 1), (.75, .5)])
+        self.assertEqual(pmf.points, [(0, 0), (.5, 1), (.75, .5), (1, 0)])
+        self.assertEqual(pmf.sup, 1)
+        self.assertEqual(pmf.get_value(.25), .5)
+        self.assertEqual(pmf.get_value(.625), .75)
+        self.assertEqual(pmf.get_value(2), 0)
+        self.assertTrue(np.array_equal(pmf.get_values([0, .25, .5, .875]), [0, .5, 1, .25]))
+        # Same shape as TriangularMF
+        x: np.ndarray = np.linspace(-.5, 1.5, 101)
+        self.assertTrue(np.allclose(PointsMF([(0, 0), (.5, 1), (1, 0)]).get_values(x), self.tmf.get_values(x)))
+        self.assertRaises(ValueError, PointsMF, [(0, 0), (0, 1)])
+        self.assertRaises(ValueError, PointsMF, [(0, 2)])
+
 
 if __name__ == '__main__':
     unittest.main()
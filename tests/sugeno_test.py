@@ -0,0 +1,181 @@
+import unittest
+import numpy as np
+from fuzzy_logic.terms import Term
+from fuzzy_logic.variables import FuzzyVariable, SugenoVariable, LinearSugenoFunction, ConstantSugenoFunction, \
+    PolynomialSugenoFunction
+from fuzzy_logic.sugeno_fs import SugenoFuzzySystem
+from fuzzy_logic.mf import TriangularMF
+
+
+class SugenoFuzzySystemTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        print(f'setUp: {self.__class__.__name__}\n')
+        self.input1: FuzzyVariable = FuzzyVariable(
+            'input1', 0, 1,
+            Term('mf1', TriangularMF(0, 0, 0.5)),
+            Term('mf2', TriangularMF(0, 0.5, 1)),
+            Term('mf3', TriangularMF(0.5, 1, 1))
+        )
+        self.input2: FuzzyVariable = FuzzyVariable(
+            'input2', 0, 1,
+            Term('mf1', TriangularMF(0, 0, 0.5)),
+            Term('mf2', TriangularMF(0, 0.5, 1)),
+            Term('mf3', TriangularMF(0.5, 1, 1))
+        )
+        self.output: SugenoVariable = SugenoVariable(
+            'output',
+            LinearSugenoFunction('mf1', {self.input1: 0.1, self.input2: 0.3}, 0.5),
+            LinearSugenoFunction('mf2', {self.input1: 0.4, self.input2: 0.2}, 0.7)
+        )
+
+    def tearDown(self) -> None:
+        print(f'tearDown: {self.__class__.__name__}\n')
+
+    def system(self) -> SugenoFuzzySystem:
+        mf: SugenoFuzzySystem = SugenoFuzzySystem([self.input1, self.input2], [self.output])
+        mf.rules.append(mf.parse_rule('if (input1 is mf1) and (input2 is mf1) then (output is mf1)'))
+        mf.rules.append(mf.parse_rule('if (input1 is mf2) and (input2 is mf2) then (output is mf2)'))
+        return mf
+
+    def test_calculate(self):
+        result = self.system().calculate({self.input1: 0.45, self.input2: 0.45})
+        self.assertAlmostEqual(result[self.output], 0.9664634146341464)
+
+    def test_calculate_batch(self):
+        mf: SugenoFuzzySystem = self.system()
+        x = np.array([[.1, .2], [.45, .45], [.3, .9], [.7, .6], [1, 1], [0, 0]])
+        # Small memory limit splits samples into several chunks
+        result = mf.calculate_batch(x, memory=100)
+        self.assertEqual(result.shape, (6, 1))
+        for (x1, x2), value in zip(x, result[:, 0]):
+            self.assertAlmostEqual(value, mf.calculate({self.input1: x1, self.input2: x2})[self.output], 12)
+        # No rule fires
+        self.assertEqual(result[4, 0], .0)
+        with self.assertRaises(Exception):
+            mf.calculate_batch(np.array([[.5, -1]]))
+
+    def test_calculate_vector(self):
+        mf: SugenoFuzzySystem = self.system()
+        result = mf.calculate_vector([.45, .45])
+        self.assertEqual(result.tolist(), [mf.calculate({self.input1: .45, self.input2: .45})[self.output]])
+        with self.assertRaises(Exception):
+            mf.calculate_vector([.45, 1.1])
+        with self.assertRaises(Exception):
+            mf.calculate_vector([.45])
+        # Bounds changed in place
+        self.input1.max_value = .4
+        for calculate in (mf.calculate_vector, lambda x: mf.calculate_batch(np.array([x]))):
+            with self.assertRaises(Exception):
+                calculate([.45, .45])
+
+    def test_missing_coefficients(self):
+        values = {self.input1: .45, self.input2: .45}
+        expected = self.system().calculate(values)[self.output]
+        self.output.functions[1] = LinearSugenoFunction('mf2', {self.input2: 0.2}, 0.7)
+        self.output.functions[0].coefficients[self.input1] = 0
+        mf: SugenoFuzzySystem = self.system()
+        self.assertAlmostEqual(mf.evaluate_functions(values)[self.output][self.output.functions[1]], .79)
+        result = mf.calculate(values)[self.output]
+        self.assertNotEqual(result, expected)
+        self.assertAlmostEqual(mf.calculate_batch(np.array([[.45, .45]]))[0, 0], result, 12)
+        self.output.functions[1] = LinearSugenoFunction('mf2', {self.input1: 0, self.input2: 0.2}, 0.7)
+        self.assertEqual(self.system().calculate(values)[self.output], result)
+
+    def test_functions_changed(self):
+        mf: SugenoFuzzySystem = self.system()
+        x = np.array([[.1, .2], [.45, .45], [.3, .4]])
+        mf.calculate_batch(x)
+        self.output.functions[0].const = 10
+        self.output.functions[1].const = 5
+        self.output.functions[1].coefficients[self.input2] = 1
+        for (x1, x2), value in zip(x, mf.calculate_batch(x)[:, 0]):
+            self.assertAlmostEqual(value, mf.calculate({self.input1: x1, self.input2: x2})[self.output], 12)
+
+    def test_function_types(self):
+        x = np.array([[.1, .2], [.45, .45], [.3, .9], [.7, .6], [1, 1], [0, 0]])
+        for functions in (
+                (ConstantSugenoFunction('mf1', .5), ConstantSugenoFunction('mf2', .7)),
+                (ConstantSugenoFunction('mf1', .5),
+                 PolynomialSugenoFunction('mf2', {(self.input1, self.input2): .4, (self.input2, self.input2): .2}, .7))
+        ):
+            self.output.functions = list(functions)
+            mf: SugenoFuzzySystem = self.system()
+            # Zero-order model combines precomputed constants
+            self.assertEqual(mf.function_constants() is None, isinstance(functions[1], PolynomialSugenoFunction))
+            mf.calculate_batch(x)
+            functions[0].const = -.5
+            result = mf.calculate_batch(x, memory=100)
+            for (x1, x2), value in zip(x, result[:, 0]):
+                expected = mf.combine_result(
+                    mf.evaluate_conditions(mf.fuzzify({self.input1: x1, self.input2: x2})),
+                    {self.output: {sf: sf.evaluate({self.input1: x1, self.input2: x2}) for sf in functions}}
+                )[self.output]
+                self.assertAlmostEqual(value, expected, 12)
+                self.assertEqual(mf.calculate({self.input1: x1, self.input2: x2})[self.output], expected)
+
+    def test_lazy_functions(self):
+        calls = []
+
+        class Counted(LinearSugenoFunction):
+            def evaluate(self, inputs):
+                calls.append(self.name)
+                return super().evaluate(inputs)
+
+            def evaluate_values(self, inp, x):
+                calls.append(self.name)
+                return super().evaluate_values(inp, x)
+
+        self.output.functions = [Counted(sf.name, sf.coefficients, sf.const) for sf in self.output.functions]
+        mf: SugenoFuzzySystem = self.system()
+        # Only the second rule fires
+        values = {self.input1: .5, self.input2: .6}
+        self.assertEqual(mf.calculate(values), mf.combine_result(mf.evaluate_conditions(mf.fuzzify(values)),
+                                                                 mf.evaluate_functions(values)))
+        self.assertEqual(calls[0], 'mf2')
+        self.assertEqual(calls.count('mf2'), 2)
+        self.assertEqual(calls.count('mf1'), 1)
+        # Batch evaluates functions of rules fired in the chunk, here every chunk is one sample
+        calls.clear()
+        mf.calculate_batch(np.array([[.5, .6], [0, 0], [1, 1]]), memory=50)
+        self.assertEqual(calls, ['mf2', 'mf1'])
+
+    def test_session(self):
+        mf: SugenoFuzzySystem = self.system()
+        mf.rules.append(mf.parse_rule('if (input1 is mf3) or (input2 is not mf1) then (output is mf1)'))
+        values = {self.input1: .1, self.input2: .2}
+        session = mf.session(values)
+        delta = mf.session(values, exact=False)
+        for x1, x2 in ((.45, None), (None, .45), (.7, .9), (1, None), (None, 0), (.5, .5)):
+            changes = {variable: value for variable, value in ((self.input1, x1), (self.input2, x2))
+                       if value is not None}
+            values.update(changes)
+            expected = mf.calculate(values)
+            self.assertEqual(session.update(changes), expected)
+            self.assertAlmostEqual(delta.update(changes)[self.output], expected[self.output], 12)
+        with self.assertRaises(Exception):
+            session.update({self.input2: -1})
+        # No rule fires: sums updated by deltas are reset to zero exactly
+        delta = self.system().session({self.input1: .45, self.input2: .45}, exact=False)
+        self.assertEqual(delta.update({self.input1: 1, self.input2: 1}), {self.output: .0})
+        self.assertAlmostEqual(delta.update({self.input1: .45, self.input2: .45})[self.output], 0.9664634146341464)
+        # Constant changed in place
+        mf.enable_cache({self.input1: .1})
+        cached = mf.calculate(values)
+        self.output.functions[0].const = 10
+        self.assertNotEqual(mf.calculate(values), cached)
+        self.assertEqual(session.update({}), mf.calculate(values))
+
+    def test_by_name(self):
+        mf: SugenoFuzzySystem = self.system()
+        self.assertIs(mf.input_by_name('input2'), self.input2)
+        self.assertIs(mf.output_by_name('output'), self.output)
+        self.assertIs(self.output.function_by_name('mf2'), self.output.functions[1])
+        with self.assertRaises(Exception):
+            mf.input_by_name('output')
+        self.input2.name = 'x2'
+        self.assertIs(mf.input_by_name('x2'), self.input2)
+
+
+if __name__ == '__main__':
+    unittest.main()
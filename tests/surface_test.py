@@ -0,0 +1,93 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from fuzzy_logic.terms import Term
+from fuzzy_logic.variables import FuzzyVariable, SugenoVariable, LinearSugenoFunction
+from fuzzy_logic.sugeno_fs import SugenoFuzzySystem
+from fuzzy_logic.surface import ControlSurface
+from fuzzy_logic.mf import TriangularMF
+
+
+class ControlSurfaceTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        print(f'setUp: {self.__class__.__name__}\n')
+        self.input1: FuzzyVariable = FuzzyVariable(
+            'input1', 0, 1,
+            Term('mf1', TriangularMF(0, 0, 0.5)),
+            Term('mf2', TriangularMF(0, 0.5, 1)),
+            Term('mf3', TriangularMF(0.5, 1, 1))
+        )
+        self.input2: FuzzyVariable = FuzzyVariable(
+            'input2', -2, 2,
+            Term('mf1', TriangularMF(-2, -2, 0)),
+            Term('mf2', TriangularMF(-2, 0, 2)),
+            Term('mf3', TriangularMF(0, 2, 2))
+        )
+        self.output1: SugenoVariable = SugenoVariable(
+            'output1',
+            LinearSugenoFunction('mf1', {self.input1: 0.1, self.input2: 0.3}, 0.5),
+            LinearSugenoFunction('mf2', {self.input1: 0.4, self.input2: -0.2}, 0.7)
+        )
+        self.output2: SugenoVariable = SugenoVariable(
+            'output2',
+            LinearSugenoFunction('mf1', {self.input1: 1., self.input2: 0}, 0),
+            LinearSugenoFunction('mf2', {self.input1: 0, self.input2: 1.}, 1)
+        )
+        self.mf: SugenoFuzzySystem = SugenoFuzzySystem([self.input1, self.input2], [self.output1, self.output2])
+        for term1 in ('mf1', 'mf2', 'mf3'):
+            for term2, function in (('mf1', 'mf1'), ('mf2', 'mf2'), ('mf3', 'mf1')):
+                for output in ('output1', 'output2'):
+                    self.mf.rules.append(self.mf.parse_rule(
+                        f'if (input1 is {term1}) and (input2 is {term2}) then ({output} is {function})'
+                    ))
+
+    def tearDown(self) -> None:
+        print(f'tearDown: {self.__class__.__name__}\n')
+
+    def test_build(self):
+        surface: ControlSurface = ControlSurface.build(self.mf, (11, 9), validation=200, seed=1)
+        self.assertEqual(surface.values.shape, (11, 9, 2))
+        # Nodes hold exact outputs of the system
+        for i, x1 in enumerate(surface.axes[0]):
+            for j, x2 in enumerate(surface.axes[1]):
+                expected = self.mf.calculate_vector([x1, x2])
+                np.testing.assert_allclose(surface.interpolate([x1, x2]), expected, atol=1e-12)
+                np.testing.assert_allclose(surface.values[i, j], expected, atol=1e-12)
+        self.assertLess(surface.max_error, .05)
+        self.assertLessEqual(surface.mean_error, surface.max_error)
+
+    def test_interpolate(self):
+        surface: ControlSurface = ControlSurface.build(self.mf, 5, validation=0)
+        self.assertTrue(np.isnan(surface.max_error))
+        x = np.random.default_rng(0).uniform([0, -2], [1, 2], (50, 2))
+        x[0] = [1, 2]
+        x[1] = [0, -2]
+        result = surface.interpolate(x)
+        self.assertEqual(result.shape, (50, 2))
+        for row, value in zip(x, result):
+            np.testing.assert_allclose(surface.interpolate(row), value, atol=1e-12)
+        # Bilinear interpolation between the four nodes of the cell
+        v = surface.values
+        np.testing.assert_allclose(
+            surface.interpolate([.125, -1.5]), (v[0, 0] + v[1, 0] + v[0, 1] + v[1, 1]) / 4, atol=1e-12
+        )
+        with self.assertRaises(Exception):
+            surface.interpolate([1.5, 0])
+        with self.assertRaises(Exception):
+            surface.interpolate(np.array([[.5, 0], [.5, 3]]))
+        with self.assertRaises(Exception):
+            surface.interpolate([.5])
+
+    def test_save_load(self):
+        surface: ControlSurface = ControlSurface.build(self.mf, (4, 6), validation=0)
+        with tempfile.TemporaryDirectory() as directory:
+            path: str = os.path.join(directory, 'surface.npy')
+            surface.save(path)
+            loaded: ControlSurface = ControlSurface.load(path)
+        self.assertEqual(loaded.shape, (4, 6))
+        np.testing.assert_array_equal(loaded.lower, surface.lower)
+        np.testing.assert_array_equal(loaded.upper, surface.upper)
+        np.testing.assert_array_equal(loaded.values, surface.values)
+        np.testing.assert_array_equal(loaded.interpolate([.3, .7]), surface.interpolate([.3, .7]))
@@ -0,0 +1,144 @@
+import unittest
+import numpy as np
+from fuzzy_logic.terms import Term
+from fuzzy_logic.variables import FuzzyVariable, SugenoVariable, SugenoFunction, LinearSugenoFunction, \
+    ConstantSugenoFunction, PolynomialSugenoFunction
+from fuzzy_logic.mf import TriangularMF, NormalMF, TriangularBank
+
+
+class FuzzyVariableTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        print(f'setUp: {self.__class__.__name__}\n')
+        centers: np.ndarray = np.linspace(0, 1, 201)
+        self.variable: FuzzyVariable = FuzzyVariable(
+            'input', 0, 1,
+            *[Term(f'mf{i}', TriangularMF(c - .005, c, c + .005)) for i, c in enumerate(centers)]
+        )
+
+    def tearDown(self) -> None:
+        print(f'tearDown: {self.__class__.__name__}\n')
+
+    def test_sparse_fuzzify(self):
+        for x in np.linspace(0, 1, 77):
+            fi = self.variable.fuzzify(x)
+            self.assertLessEqual(len(fi), 3)
+            for term in self.variable.terms:
+                self.assertEqual(fi[term], term.mf.get_value(x))
+
+    def test_index_update(self):
+        self.assertEqual([t.name for t in self.variable.active_terms(.5025)], ['mf100', 'mf101'])
+        self.variable.terms.append(Term('wide', NormalMF(.5, .1)))
+        self.variable.terms.append(Term('narrow', NormalMF(.2, .01, truncation=3)))
+        self.assertEqual([t.name for t in self.variable.active_terms(.5025)], ['mf100', 'mf101', 'wide'])
+        self.assertEqual([t.name for t in self.variable.active_terms(.2125)], ['mf42', 'mf43', 'wide', 'narrow'])
+        self.variable.terms[-1].mf.b = .5
+        self.assertEqual([t.name for t in self.variable.active_terms(.5025)], ['mf100', 'mf101', 'wide', 'narrow'])
+        # Support widened in place
+        variable: FuzzyVariable = FuzzyVariable('input', 0, 1, Term('low', TriangularMF(0, 0, .4)))
+        self.assertEqual(dict(variable.fuzzify(.5)), {})
+        variable.terms[0].mf.x3 = .8
+        self.assertEqual(dict(variable.fuzzify(.5)), {variable.terms[0]: .375})
+        self.assertEqual(variable.fuzzify_values([.5]).tolist(), [[.375]])
+        variable.terms[0].mf = TriangularMF(.6, .7, .8)
+        self.assertEqual(dict(variable.fuzzify(.5)), {})
+
+    def test_bank(self):
+        params: np.ndarray = np.array([[term.mf.x1, term.mf.x2, term.mf.x3] for term in self.variable.terms])
+        variable: FuzzyVariable = FuzzyVariable.from_triangular('input', 0, 1, params)
+        self.assertIsInstance(variable.bank, TriangularBank)
+        # Terms are created on first access
+        self.assertEqual(variable.terms.created(), [])
+        self.assertEqual([term.name for term in variable.fuzzify(.5025)], ['mf101', 'mf102'])
+        self.assertEqual([i for i, _ in variable.terms.created()], [100, 101])
+        self.assertIs(variable.terms[100], variable.terms.created()[0][1])
+        self.assertFalse(hasattr(variable.terms[0], '__dict__'))
+        self.assertFalse(hasattr(variable.terms[0].mf, '__dict__'))
+        # Views keep only the bank and the row, parameters are not stored per term
+        slots: list = [slot for cls in type(variable.terms[0].mf).__mro__ for slot in getattr(cls, '__slots__', ())]
+        self.assertEqual(slots, ['bank', 'index'])
+        self.assertEqual(variable.term_by_name('mf3').mf.x2, params[2, 1])
+        x: np.ndarray = np.linspace(0, 1, 33)
+        self.assertTrue(np.array_equal(variable.fuzzify_values(x), self.variable.fuzzify_values(x)))
+        for v in x:
+            self.assertEqual(list(variable.fuzzify(v).values()), list(self.variable.fuzzify(v).values()))
+        # Terms are views of the rows of the bank
+        variable.terms[0].mf.x3 = .5
+        self.assertEqual(variable.bank.params[0, 2], .5)
+        self.assertEqual(variable.fuzzify(.5)[variable.terms[0]], 0)
+        self.assertEqual(variable.fuzzify_values([.5])[0], 0)
+        variable.bank.set_parameter(0, 2, .6)
+        self.assertAlmostEqual(variable.fuzzify(.5)[variable.terms[0]], 1 / 6)
+        with self.assertRaises(ValueError):
+            variable.bank.params[0, 2] = .7
+        variable.terms[0].mf = NormalMF(0, .1)
+        self.assertIsNone(variable.bank)
+        self.assertEqual(variable.fuzzify_values(x).shape, (201, 33))
+        self.assertRaises(ValueError, FuzzyVariable.from_triangular, 'input', 0, 1, [[0, 1, .5]])
+
+    def test_term_by_name(self):
+        self.assertIs(self.variable.term_by_name('mf100'), self.variable.terms[100])
+        self.assertIsNone(self.variable.term_by_name('mf1000'))
+        term = Term('mf1000', TriangularMF(.2, .3, .4))
+        self.variable.terms.append(term)
+        self.assertIs(self.variable.term_by_name('mf1000'), term)
+        # Renamed in place
+        term.name = 'renamed'
+        self.assertIsNone(self.variable.term_by_name('mf1000'))
+        self.assertIs(self.variable.term_by_name('renamed'), term)
+        # First term with the name wins
+        self.variable.terms.insert(0, Term('renamed', TriangularMF(.2, .3, .4)))
+        self.assertIs(self.variable.term_by_name('renamed'), self.variable.terms[0])
+
+    def test_coefficient_matrix(self):
+        x1: FuzzyVariable = FuzzyVariable('x1', 0, 1)
+        x2: FuzzyVariable = FuzzyVariable('x2', 0, 1)
+
+        class Square(SugenoFunction):
+            name = 'square'
+
+            def evaluate(self, inputs):
+                return inputs[x1] ** 2
+
+        output: SugenoVariable = SugenoVariable(
+            'output', LinearSugenoFunction('f1', {x1: 2., x2: 3.}, 1.), Square(), LinearSugenoFunction('f2', {x2: 4.})
+        )
+        matrix, linear = output.coefficient_matrix([x1, x2])
+        self.assertEqual(matrix.tolist(), [[1, 2, 3], [0, 0, 0], [0, 0, 4]])
+        self.assertEqual(linear.tolist(), [True, False, True])
+        self.assertIs(output.coefficient_matrix([x1, x2])[0], matrix)
+        # Missing coefficients are zero
+        self.assertEqual(output.functions[2].evaluate({x1: .5, x2: .25}), 1.)
+        # Coefficients and constants changed in place
+        output.functions[2].coefficients[x1] = 5.
+        output.functions[0].const = 2.
+        self.assertEqual(output.coefficient_matrix([x1, x2])[0].tolist(), [[2, 2, 3], [0, 0, 0], [0, 5, 4]])
+        self.assertEqual(output.coefficient_matrix([x2])[0].tolist(), [[2, 3], [0, 0], [0, 4]])
+
+    def test_sugeno_functions(self):
+        x1: FuzzyVariable = FuzzyVariable('x1', 0, 1)
+        x2: FuzzyVariable = FuzzyVariable('x2', 0, 1)
+        x = np.random.default_rng(0).uniform(0, 1, (20, 2))
+        constant: ConstantSugenoFunction = ConstantSugenoFunction('c', 1.5)
+        polynomial: PolynomialSugenoFunction = PolynomialSugenoFunction.quadratic(
+            'p', [x1, x2], [2., 0], [[3., 1.], [7., 0]], .5
+        )
+        self.assertEqual(polynomial.coefficients, {(x1,): 2., (x1, x1): 3., (x1, x2): 1.})
+        self.assertAlmostEqual(polynomial.evaluate({x1: .5, x2: .2}), .5 + 1 + .75 + .1)
+        for function in (constant, polynomial):
+            expected = [function.evaluate({x1: a, x2: b}) for a, b in x]
+            self.assertEqual(function.evaluate_values([x1, x2], x).tolist(), expected)
+        output: SugenoVariable = SugenoVariable('output', constant, ConstantSugenoFunction('d', -1))
+        self.assertEqual(output.constants.tolist(), [1.5, -1])
+        self.assertEqual(output.coefficient_matrix([x1, x2])[0].tolist(), [[1.5, 0, 0], [-1, 0, 0]])
+        # Constants changed in place
+        output.functions[1].const = 2.
+        self.assertEqual(output.constants.tolist(), [1.5, 2])
+        self.assertEqual(output.coefficient_matrix([x1, x2])[0].tolist(), [[1.5, 0, 0], [2, 0, 0]])
+        output.functions.append(polynomial)
+        self.assertIsNone(output.constants)
+        self.assertEqual(output.coefficient_matrix([x1, x2])[1].tolist(), [True, True, False])
+
+
+if __name__ == '__main__':
+    unittest.main()